@@ -6,16 +6,47 @@ from dotenv import load_dotenv
 # Load environment variables from .env file BEFORE importing routers
 load_dotenv()
 
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from middleware.compression import SelectiveGZipMiddleware
+from middleware.etag import ETagMiddleware
 from routers import conversation, tts, insights
 
+
+# Interactive docs are a development aid; keep them off in production
+DEBUG = os.getenv("DEBUG", "False").lower() in ("1", "true", "yes")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup/shutdown hooks"""
+    # Build the OpenAPI schema once up front (FastAPI caches it) so the
+    # first /openapi.json request doesn't pay for generating it
+    app.openapi()
+    yield
+    # Release pooled upstream connections on shutdown
+    await tts.tts_service.aclose()
+    await conversation.gemini_service.aclose()
+
+
 app = FastAPI(
     title="AI Doctor API",
     description="Backend API for AI Doctor video consultation app",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+    docs_url="/docs" if DEBUG else None,
+    redoc_url="/redoc" if DEBUG else None
 )
 
+# Conditional responses for endpoints that are deterministic per request body
+# (the TTS routes derive their ETag from the request and handle it themselves).
+# Registered before CORS so it sits inside it and its responses get CORS headers.
+app.add_middleware(ETagMiddleware, paths=["/api/insights"])
+
 # CORS configuration for Next.js frontend
 app.add_middleware(
     CORSMiddleware,
@@ -28,6 +59,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
+)
+
+# Compress JSON responses; MP3 audio is already compressed and SSE
+# events must reach the client unbuffered
+app.add_middleware(
+    SelectiveGZipMiddleware,
+    minimum_size=512,
+    compresslevel=5,
+    exclude_paths=["/api/tts", "/api/chat/stream"]
 )
 
 # Include routers
@@ -0,0 +1,36 @@
+"""
+Compression middleware - gzip JSON responses, leave audio untouched
+"""
+from typing import Iterable
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class SelectiveGZipMiddleware:
+    """GZip responses except on routes that serve already-compressed audio"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 512,
+        compresslevel: int = 5,
+        exclude_paths: Iterable[str] = ()
+    ):
+        """
+        Initialize middleware
+
+        Args:
+            app: ASGI application to wrap
+            minimum_size: Smallest body (bytes) worth compressing
+            compresslevel: gzip level (1 fastest - 9 smallest)
+            exclude_paths: Path prefixes that bypass compression (e.g. MP3 routes)
+        """
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=compresslevel)
+        self.exclude_paths = tuple(exclude_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and not scope["path"].startswith(self.exclude_paths):
+            await self.gzip(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
@@ -0,0 +1,111 @@
+"""
+ETag middleware - conditional responses for deterministic endpoints
+"""
+import hashlib
+from typing import Iterable, Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CACHE_CONTROL = "private, max-age=300"
+
+
+def compute_etag(data: bytes) -> str:
+    """Build a strong ETag from raw bytes (BLAKE2b is fast and in the stdlib)"""
+    return f'"{hashlib.blake2b(data, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag
+
+    Args:
+        if_none_match: Raw If-None-Match header value (may list several tags)
+        etag: Current ETag of the resource (strong or weak)
+
+    Returns:
+        True if the client's cached copy is still current
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison (RFC 9110 8.8.3.2): the W/ prefix is ignored on both sides
+    opaque = etag.removeprefix("W/")
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == opaque for tag in candidates)
+
+
+def not_modified(etag: str, cache_control: str = CACHE_CONTROL) -> Response:
+    """Empty 304 response carrying the validator headers"""
+    return Response(
+        status_code=304,
+        headers={"ETag": etag, "Cache-Control": cache_control}
+    )
+
+
+class ETagMiddleware:
+    """
+    Add ETags to buffered responses and answer matching If-None-Match requests
+    
+    Per RFC 9110 a match is a 304 for GET/HEAD and a 412 for any other
+    method. The tag is computed from the finished body, so the route's work
+    has already been done when the check runs; a match only saves the
+    transfer.
+    """
+
+    def __init__(self, app: ASGIApp, paths: Iterable[str]):
+        """
+        Initialize middleware
+
+        Args:
+            app: ASGI application to wrap
+            paths: Exact request paths whose responses get an ETag
+        """
+        self.app = app
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        body_parts = []
+
+        async def buffer_send(message: Message) -> None:
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body_parts.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            # Response complete - hash the body once and decide 200 vs 304/412
+            body = b"".join(body_parts)
+            if start_message["status"] != 200:
+                await send(start_message)
+                await send({"type": "http.response.body", "body": body})
+                return
+
+            etag = compute_etag(body)
+            if_none_match = Headers(scope=scope).get("if-none-match")
+            if etag_matches(if_none_match, etag):
+                if scope["method"] in ("GET", "HEAD"):
+                    await not_modified(etag)(scope, receive, send)
+                else:
+                    await Response(status_code=412, headers={"ETag": etag})(scope, receive, send)
+                return
+
+            headers = MutableHeaders(scope=start_message)
+            headers["ETag"] = etag
+            headers["Cache-Control"] = CACHE_CONTROL
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, buffer_send)
@@ -1,22 +1,27 @@
 """
 Pydantic models for request/response validation
 """
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
+from pydantic import BaseModel, ConfigDict, Field, StringConstraints
+from typing import Annotated, List, Optional, Dict
 from datetime import datetime
 
 
+# face-api.js labels, canonicalized once at validation ("Happy " -> "happy")
+# so services can compare them directly
+Emotion = Annotated[str, StringConstraints(strip_whitespace=True, to_lower=True)]
+
+
 # ============= Chat/Conversation Schemas =============
 
 class ChatRequest(BaseModel):
     """Request model for chat endpoint"""
     message: str = Field(..., description="User's message text")
-    emotion: str = Field(..., description="Detected emotion from face-api.js")
+    emotion: Emotion = Field(..., description="Detected emotion from face-api.js")
     age: Optional[int] = Field(None, description="Detected age from face-api.js")
     age_category: Optional[str] = Field(None, description="Age category (e.g., 'Young Adult', 'Senior')")
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "message": "I've been feeling tired lately",
                 "emotion": "sad",
@@ -24,6 +29,7 @@ class ChatRequest(BaseModel):
                 "age_category": "Young Adult"
             }
         }
+    )
 
 
 class ChatResponse(BaseModel):
@@ -38,14 +44,15 @@ class ChatResponse(BaseModel):
         description="Whether AI suggests ending the consultation"
     )
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "response": "I understand. How long have you been experiencing this fatigue?",
                 "followup_needed": True,
                 "should_end_consultation": False
             }
         }
+    )
 
 
 # ============= TTS Schemas =============
@@ -58,33 +65,14 @@ class TTSRequest(BaseModel):
         description="ElevenLabs voice ID (uses default if not provided)"
     )
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "text": "I understand. Can you tell me more about that?",
                 "voice_id": None
             }
         }
-
-
-class TTSResponse(BaseModel):
-    """Response model for text-to-speech endpoint"""
-    audio_url: Optional[str] = Field(
-        None,
-        description="URL to audio file (if stored)"
     )
-    audio_base64: Optional[str] = Field(
-        None,
-        description="Base64 encoded audio data"
-    )
-    
-    class Config:
-        json_schema_extra = {
-            "example": {
-                "audio_url": "https://example.com/audio.mp3",
-                "audio_base64": None
-            }
-        }
 
 
 # ============= Insights Schemas =============
@@ -94,7 +82,9 @@ class ConversationMessage(BaseModel):
     role: str = Field(..., description="Speaker role (user or assistant)")
     content: str = Field(..., description="Message content")
     timestamp: str = Field(..., description="ISO format timestamp")
-    emotion: Optional[str] = Field(None, description="Detected emotion")
+    emotion: Optional[Emotion] = Field(None, description="Detected emotion")
+    
+    model_config = ConfigDict(frozen=True)
 
 
 class InsightsRequest(BaseModel):
@@ -103,7 +93,7 @@ class InsightsRequest(BaseModel):
         ...,
         description="Full conversation history"
     )
-    emotions: List[str] = Field(
+    emotions: List[Emotion] = Field(
         ...,
         description="List of detected emotions throughout conversation"
     )
@@ -112,8 +102,8 @@ class InsightsRequest(BaseModel):
         description="Timestamps for emotion detections"
     )
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "conversation": [
                     {
@@ -127,12 +117,13 @@ class InsightsRequest(BaseModel):
                 "timestamps": ["2025-11-22T10:00:00Z", "2025-11-22T10:01:00Z", "2025-11-22T10:02:00Z"]
             }
         }
+    )
 
 
 class EmotionChartData(BaseModel):
-    """Emotion data point for charting"""
-    timestamp: str = Field(..., description="ISO format timestamp")
-    emotion: str = Field(..., description="Detected emotion")
+    """Emotion timeline for charting, as parallel arrays"""
+    timestamps: List[str] = Field(..., description="ISO format timestamps")
+    emotions: List[str] = Field(..., description="Detected emotion at each timestamp")
 
 
 class EmotionStats(BaseModel):
@@ -152,7 +143,7 @@ class SummaryData(BaseModel):
 class InsightsResponse(BaseModel):
     """Response model for insights endpoint"""
     summary: SummaryData = Field(..., description="Structured conversation summary")
-    emotion_chart: List[EmotionChartData] = Field(
+    emotion_chart: EmotionChartData = Field(
         ...,
         description="Emotion data for visualization"
     )
@@ -161,8 +152,8 @@ class InsightsResponse(BaseModel):
         description="Emotion statistics"
     )
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "summary": {
                     "overview": "Patient discussed fatigue and sleep issues...",
@@ -172,9 +163,10 @@ class InsightsResponse(BaseModel):
                         "Follow up in 2 weeks"
                     ]
                 },
-                "emotion_chart": [
-                    {"timestamp": "2025-11-22T10:00:00Z", "emotion": "sad"}
-                ],
+                "emotion_chart": {
+                    "timestamps": ["2025-11-22T10:00:00Z"],
+                    "emotions": ["sad"]
+                },
                 "emotion_stats": {
                     "total_samples": 10,
                     "emotion_counts": {"sad": 5, "neutral": 3, "happy": 2},
@@ -183,4 +175,5 @@ class InsightsResponse(BaseModel):
                 }
             }
         }
+    )
 
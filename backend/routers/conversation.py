@@ -1,7 +1,10 @@
 """
 Conversation router - handles Gemini chat interactions
 """
+from typing import AsyncIterator, Dict
+import orjson
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from models.schemas import ChatRequest, ChatResponse
 from services.gemini_service import GeminiService
 from services.emotion_analyzer import EmotionAnalyzer
@@ -48,3 +51,46 @@ async def chat(request: ChatRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Stream the AI doctor response as Server-Sent Events
+    
+    Each event is a JSON object: {"delta": "..."} while text arrives, then
+    a final {"done": true, "text", "followup_needed",
+    "should_end_consultation"} with the full cleaned reply. A stream that
+    fails after text was sent ends with {"done": true, "error": true} and
+    no replacement text; the client may keep or discard the partial reply.
+    
+    Args:
+        request: ChatRequest containing message, detected emotion, and age
+        
+    Returns:
+        StreamingResponse of text/event-stream events
+    """
+    emotion_context = emotion_analyzer.analyze_mismatch(
+        message=request.message,
+        detected_emotion=request.emotion
+    )
+    
+    events = gemini_service.stream_response(
+        message=request.message,
+        emotion=request.emotion,
+        age=request.age,
+        age_category=request.age_category,
+        emotion_context=emotion_context
+    )
+    
+    return StreamingResponse(
+        _sse(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+
+async def _sse(events: AsyncIterator[Dict]) -> AsyncIterator[bytes]:
+    """Frame each event as a Server-Sent Events data line"""
+    async for event in events:
+        yield b"data: " + orjson.dumps(event) + b"\n\n"
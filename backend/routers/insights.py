@@ -1,7 +1,11 @@
 """
 Insights router - generates conversation summaries and analytics
 """
-from fastapi import APIRouter, HTTPException
+from typing import Dict, Type
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ValidationError
 from models.schemas import InsightsRequest, InsightsResponse
 from services.gemini_service import GeminiService
 from services.emotion_analyzer import EmotionAnalyzer
@@ -13,17 +17,56 @@ gemini_service = GeminiService()
 emotion_analyzer = EmotionAnalyzer()
 
 
-@router.post("/insights", response_model=InsightsResponse)
-async def generate_insights(request: InsightsRequest):
+def _inline_schema(model: Type[BaseModel]) -> Dict:
+    """JSON schema for a model with nested $defs inlined (for openapi_extra)"""
+    schema = model.model_json_schema()
+    defs = schema.pop("$defs", {})
+    
+    def resolve(node):
+        if isinstance(node, dict):
+            if "$ref" in node:
+                return resolve(defs[node["$ref"].rsplit("/", 1)[-1]])
+            return {key: resolve(value) for key, value in node.items()}
+        if isinstance(node, list):
+            return [resolve(value) for value in node]
+        return node
+    
+    return resolve(schema)
+
+
+@router.post(
+    "/insights",
+    response_model=InsightsResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": _inline_schema(InsightsRequest)}}
+        }
+    }
+)
+async def generate_insights(http_request: Request):
     """
     Generate conversation summary and emotion analytics
     
+    The body is validated straight from raw bytes with pydantic-core's JSON
+    parser, skipping the intermediate json.loads dict FastAPI would build
+    for a long conversation.
+    
     Args:
-        request: InsightsRequest containing conversation history and emotions
+        http_request: Raw request whose JSON body is an InsightsRequest
         
     Returns:
         InsightsResponse with summary and emotion chart data
     """
+    try:
+        request = InsightsRequest.model_validate_json(await http_request.body())
+    except ValidationError as e:
+        # Same 422 shape FastAPI's own body validation produces
+        raise RequestValidationError([
+            {**error, "loc": ("body", *error["loc"])}
+            for error in e.errors(include_url=False)
+        ])
+    
     try:
         # Generate conversation summary using Gemini
         summary = await gemini_service.generate_summary(
@@ -41,11 +84,13 @@ async def generate_insights(request: InsightsRequest):
             emotions=request.emotions
         )
         
-        return InsightsResponse(
-            summary=summary,
-            emotion_chart=emotion_chart,
-            emotion_stats=emotion_stats
-        )
+        # Services already return plain JSON-ready dicts; serialize them
+        # directly instead of re-validating the (potentially long) chart
+        return ORJSONResponse(content={
+            "summary": summary,
+            "emotion_chart": emotion_chart,
+            "emotion_stats": emotion_stats
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
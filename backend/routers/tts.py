@@ -1,9 +1,11 @@
 """
 Audio router - handles ElevenLabs STT and TTS
 """
-from fastapi import APIRouter, HTTPException, UploadFile, File
-from fastapi.responses import StreamingResponse
-from models.schemas import TTSRequest, TTSResponse
+from typing import AsyncIterator, Optional
+from fastapi import APIRouter, HTTPException, UploadFile, File, Header
+from fastapi.responses import Response, StreamingResponse
+from middleware.etag import etag_matches, not_modified
+from models.schemas import TTSRequest
 from services.elevenlabs_service import ElevenLabsService
 from pydantic import BaseModel
 
@@ -12,6 +14,10 @@ router = APIRouter()
 # Initialize service
 tts_service = ElevenLabsService()
 
+# Audio is deterministic per (text, voice, model), so clients may keep it a
+# day; private because replies can contain the patient's health details
+AUDIO_CACHE_CONTROL = "private, max-age=86400"
+
 
 class STTResponse(BaseModel):
     """Response model for speech-to-text"""
@@ -30,60 +36,108 @@ async def speech_to_text(audio: UploadFile = File(...)):
         STTResponse with transcribed text
     """
     try:
-        audio_data = await audio.read()
-        text = await tts_service.speech_to_text(audio_data)
+        # Hand the spooled upload file straight to the service (no full read)
+        text = await tts_service.speech_to_text(audio.file, audio.filename)
         
         return STTResponse(text=text)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/tts", response_model=TTSResponse)
-async def text_to_speech(request: TTSRequest):
+@router.post(
+    "/tts",
+    response_class=Response,
+    responses={200: {"content": {"audio/mpeg": {}}, "description": "MP3 audio"}}
+)
+async def text_to_speech(
+    request: TTSRequest,
+    if_none_match: Optional[str] = Header(None)
+):
     """
     Convert text to speech using ElevenLabs
     
+    Returns the complete clip as raw MP3 with a Content-Length, for
+    short fixed phrases (greetings, previews) that benefit from caching;
+    use /tts/stream for live replies.
+    
     Args:
         request: TTSRequest containing text to convert
+        if_none_match: Optional ETag of the client's cached copy
         
     Returns:
-        TTSResponse with audio URL or base64 encoded audio
+        Response with audio/mpeg data
     """
+    etag = tts_service.audio_etag(request.text, request.voice_id)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, AUDIO_CACHE_CONTROL)
+    
     try:
-        audio_result = await tts_service.generate_speech(
+        audio_bytes = await tts_service.generate_speech(
             text=request.text,
             voice_id=request.voice_id
         )
         
-        return TTSResponse(
-            audio_url=audio_result.get("audio_url"),
-            audio_base64=audio_result.get("audio_base64")
+        return Response(
+            content=audio_bytes,
+            media_type="audio/mpeg",
+            headers={
+                "Content-Length": str(len(audio_bytes)),
+                "ETag": etag,
+                "Cache-Control": AUDIO_CACHE_CONTROL
+            }
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/tts/stream")
-async def text_to_speech_stream(request: TTSRequest):
+async def text_to_speech_stream(
+    request: TTSRequest,
+    if_none_match: Optional[str] = Header(None)
+):
     """
     Stream audio response directly
     
+    The weak ETag is derived from the request (text, voice, model) rather
+    than the audio bytes, so the stream never has to be buffered to produce it.
+    
     Args:
         request: TTSRequest containing text to convert
+        if_none_match: Optional ETag of the client's cached copy
         
     Returns:
         StreamingResponse with audio data
     """
+    etag = tts_service.audio_etag(request.text, request.voice_id)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, AUDIO_CACHE_CONTROL)
+    
     try:
-        audio_stream = await tts_service.generate_speech_stream(
+        audio_stream = tts_service.generate_speech_stream(
             text=request.text,
             voice_id=request.voice_id
         )
         
+        # Pull the first chunk up front so upstream failures still surface
+        # as a 500 instead of a truncated audio stream
+        first_chunk = await anext(audio_stream, b"")
+        
         return StreamingResponse(
-            audio_stream,
-            media_type="audio/mpeg"
+            _forward_stream(first_chunk, audio_stream),
+            media_type="audio/mpeg",
+            headers={"ETag": etag, "Cache-Control": AUDIO_CACHE_CONTROL}
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+async def _forward_stream(
+    first_chunk: bytes,
+    audio_stream: AsyncIterator[bytes]
+) -> AsyncIterator[bytes]:
+    """Re-emit the primed first chunk, then forward the rest as it arrives"""
+    if first_chunk:
+        yield first_chunk
+    async for chunk in audio_stream:
+        yield chunk
+
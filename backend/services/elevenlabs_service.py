@@ -2,10 +2,15 @@
 ElevenLabs service - handles speech-to-text and text-to-speech conversion
 """
 import os
-import base64
-from typing import Dict, Optional, AsyncIterator, List
-from io import BytesIO
-from elevenlabs import ElevenLabs
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import BinaryIO, Dict, Optional, AsyncIterator, List
+import httpx
+from elevenlabs import AsyncElevenLabs
+from elevenlabs.core.api_error import ApiError
+from services.retry import retry_with_backoff
+from services.single_flight import SingleFlight
 
 
 class ElevenLabsService:
@@ -17,12 +22,38 @@ class ElevenLabsService:
         if not self.api_key:
             raise ValueError("ELEVENLABS_API_KEY not found in environment variables")
         
-        # Initialize ElevenLabs client
-        self.client = ElevenLabs(api_key=self.api_key)
+        # Shared connection pool so TTS/STT calls reuse warm TLS connections
+        # (HTTP/2 lets concurrent requests multiplex over a single connection)
+        self._http = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=64, max_connections=128),
+            timeout=httpx.Timeout(30.0, connect=5.0)
+        )
+        
+        # Initialize ElevenLabs client on top of the shared pool
+        self.client = AsyncElevenLabs(api_key=self.api_key, httpx_client=self._http)
         
         # Default voice ID (Rachel - natural, warm voice)
         self.default_voice_id = os.getenv("ELEVENLABS_VOICE_ID", "21m00Tcm4TlvDq8ikWAM")
         
+        # TTS model used for every synthesis call (part of the cache key)
+        self.model_id = "eleven_monolingual_v1"
+        
+        # In-process LRU of synthesized MP3 bytes, bounded by total size.
+        # Identical (text, voice) requests - greetings, voice previews,
+        # retries - are served from memory instead of re-hitting ElevenLabs.
+        self._audio_cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._audio_cache_bytes = 0
+        self._audio_cache_max_bytes = int(
+            os.getenv("TTS_CACHE_MAX_BYTES", str(64 * 1024 * 1024))
+        )
+        
+        # Concurrent identical requests share one synthesis call
+        self._speech_flight = SingleFlight()
+        
+        # Cap concurrent ElevenLabs requests; 429s are retried with backoff
+        self._semaphore = asyncio.Semaphore(int(os.getenv("ELEVENLABS_MAX_CONCURRENCY", "64")))
+        
         # Voice settings for natural doctor voice
         self.voice_settings = {
             "stability": 0.5,
@@ -35,7 +66,7 @@ class ElevenLabsService:
         self,
         text: str,
         voice_id: Optional[str] = None
-    ) -> Dict[str, any]:
+    ) -> bytes:
         """
         Generate speech from text using ElevenLabs TTS
         
@@ -44,28 +75,19 @@ class ElevenLabsService:
             voice_id: Optional voice ID (uses default if not provided)
             
         Returns:
-            Dict containing audio_base64 encoded audio data
+            Complete MP3 audio bytes
         """
         try:
             voice = self._get_voice_id(voice_id)
+            cache_key = self._cache_key(text, voice)
             
-            # Generate audio using ElevenLabs text_to_speech
-            audio_generator = self.client.text_to_speech.convert(
-                voice_id=voice,
-                text=text,
-                model_id="eleven_monolingual_v1"
-            )
-            
-            # Convert generator to bytes
-            audio_bytes = b"".join(audio_generator)
+            audio_bytes = self._cache_get(cache_key)
+            if audio_bytes is None:
+                audio_bytes = await self._speech_flight.do(
+                    cache_key, lambda: self._synthesize(text, voice, cache_key)
+                )
             
-            # Encode to base64 for easy transport
-            audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
-            
-            return {
-                "audio_url": None,
-                "audio_base64": audio_base64
-            }
+            return audio_bytes
         except Exception as e:
             raise Exception(f"TTS generation failed: {str(e)}")
     
@@ -86,48 +108,149 @@ class ElevenLabsService:
         """
         try:
             voice = self._get_voice_id(voice_id)
+            cache_key = self._cache_key(text, voice)
             
-            # Generate streaming audio
-            audio_stream = self.client.text_to_speech.convert(
-                voice_id=voice,
-                text=text,
-                model_id="eleven_monolingual_v1"
-            )
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+            
+            # Hold a concurrency slot for the life of the stream
+            async with self._semaphore:
+                # Rate limits surface on the first chunk, so retry up to there
+                first_chunk, audio_stream = await self._with_retries(
+                    lambda: self._start_stream(text, voice)
+                )
+                
+                # Yield chunks as they arrive, keeping a copy for the cache
+                chunks = [first_chunk]
+                yield first_chunk
+                async for chunk in audio_stream:
+                    chunks.append(chunk)
+                    yield chunk
             
-            # Yield chunks as they arrive
-            for chunk in audio_stream:
-                yield chunk
+            # Only cache clips that streamed to completion
+            self._cache_put(cache_key, b"".join(chunks))
                 
         except Exception as e:
             raise Exception(f"TTS streaming failed: {str(e)}")
     
+    async def _synthesize(self, text: str, voice: str, cache_key: str) -> bytes:
+        """Synthesize a full clip with ElevenLabs and store it in the cache"""
+        async def convert() -> bytes:
+            # Generate audio using ElevenLabs text_to_speech
+            audio_generator = self.client.text_to_speech.convert(
+                voice_id=voice,
+                text=text,
+                model_id=self.model_id
+            )
+            
+            # Convert generator to bytes
+            return b"".join([chunk async for chunk in audio_generator])
+        
+        async with self._semaphore:
+            audio_bytes = await self._with_retries(convert)
+        self._cache_put(cache_key, audio_bytes)
+        return audio_bytes
+    
+    async def _start_stream(self, text: str, voice: str):
+        """Open a TTS stream and pull its first chunk (where API errors surface)"""
+        audio_stream = self.client.text_to_speech.convert(
+            voice_id=voice,
+            text=text,
+            model_id=self.model_id
+        )
+        first_chunk = await anext(audio_stream, b"")
+        return first_chunk, audio_stream
+    
+    async def _with_retries(self, fn):
+        """Run an ElevenLabs call, retrying rate-limit (429) responses"""
+        return await retry_with_backoff(
+            fn,
+            should_retry=lambda e: isinstance(e, ApiError) and e.status_code == 429,
+            retry_after=self._retry_after
+        )
+    
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        """Read the server's Retry-After hint (seconds) from an ApiError"""
+        headers = {k.lower(): v for k, v in (getattr(error, "headers", None) or {}).items()}
+        try:
+            return float(headers["retry-after"])
+        except (KeyError, ValueError):
+            return None
+    
     def _get_voice_id(self, voice_id: Optional[str]) -> str:
         """Get voice ID with fallback to default"""
         return voice_id or self.default_voice_id
     
+    def _cache_key(self, text: str, voice_id: str) -> str:
+        """Build the audio cache key for a (text, voice, model) triple"""
+        raw = f"{text}|{voice_id}|{self.model_id}".encode("utf-8")
+        return hashlib.sha256(raw).hexdigest()
+    
+    def audio_etag(self, text: str, voice_id: Optional[str] = None) -> str:
+        """
+        Weak ETag for the clip a request would produce, without synthesizing it
+        
+        The tag identifies the request, not the bytes: synthesis isn't
+        byte-for-byte deterministic, so a re-synthesized clip after a cache
+        eviction is equivalent but not identical.
+        """
+        return f'W/"{self._cache_key(text, self._get_voice_id(voice_id))}"'
+    
+    def _cache_get(self, key: str) -> Optional[bytes]:
+        """Return cached audio and mark it as recently used"""
+        audio = self._audio_cache.get(key)
+        if audio is not None:
+            self._audio_cache.move_to_end(key)
+        return audio
+    
+    def _cache_put(self, key: str, audio: bytes):
+        """Store audio, evicting least recently used clips over the size cap"""
+        if not audio or len(audio) > self._audio_cache_max_bytes:
+            return
+        
+        previous = self._audio_cache.pop(key, None)
+        if previous is not None:
+            self._audio_cache_bytes -= len(previous)
+        
+        self._audio_cache[key] = audio
+        self._audio_cache_bytes += len(audio)
+        
+        while self._audio_cache_bytes > self._audio_cache_max_bytes:
+            _, evicted = self._audio_cache.popitem(last=False)
+            self._audio_cache_bytes -= len(evicted)
+    
     async def speech_to_text(
         self,
-        audio_data: bytes
+        audio_file: BinaryIO,
+        filename: Optional[str] = None
     ) -> str:
         """
         Convert speech to text using ElevenLabs STT
         
+        The file object is streamed into the multipart upload in chunks,
+        so the clip is never held in memory as one bytes object.
+        
         Args:
-            audio_data: Audio file bytes
+            audio_file: Seekable binary file-like object with the audio
+            filename: Original upload name (defaults to audio.webm)
             
         Returns:
             Transcribed text
         """
         try:
-            # Convert bytes to BytesIO for file-like object
-            audio_file = BytesIO(audio_data)
-            audio_file.name = "audio.webm"  # Add name attribute for the API
+            async def transcribe():
+                audio_file.seek(0)  # Rewind in case this is a retry
+                # Use ElevenLabs speech-to-text API
+                return await self.client.speech_to_text.convert(
+                    file=(filename or "audio.webm", audio_file),
+                    model_id="scribe_v1",  # Scribe model for transcription
+                )
             
-            # Use ElevenLabs speech-to-text API
-            transcription = self.client.speech_to_text.convert(
-                file=audio_file,
-                model_id="scribe_v1",  # Scribe model for transcription
-            )
+            async with self._semaphore:
+                transcription = await self._with_retries(transcribe)
             
             # Extract text from transcription response
             # The response contains the transcribed text
@@ -150,7 +273,7 @@ class ElevenLabsService:
             List of available voices with their details
         """
         try:
-            voices_response = self.client.voices.get_all()
+            voices_response = await self.client.voices.get_all()
             
             # Convert voice objects to dictionaries
             voices_list = []
@@ -166,4 +289,7 @@ class ElevenLabsService:
             return voices_list
         except Exception as e:
             raise Exception(f"Failed to list voices: {str(e)}")
-
+    
+    async def aclose(self):
+        """Close the shared HTTP connection pool"""
+        await self._http.aclose()
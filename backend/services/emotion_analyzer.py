@@ -1,22 +1,109 @@
 """
 Emotion analyzer service - detects emotion mismatches and patterns
 """
-from typing import Dict, List, Optional
+from collections import Counter
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 
 
+# VADER loads its ~7500-entry lexicon on construction, so share one per process
+_ANALYZER = SentimentIntensityAnalyzer()
+
+
+@lru_cache(maxsize=4096)
+def _vader_scores(text: str) -> Tuple[Tuple[str, float], ...]:
+    """
+    VADER polarity scores for a message, memoized on the exact text
+
+    Short replies ("I'm fine", "yes", "ok") repeat constantly in a
+    consultation. The text is not case-folded because VADER boosts
+    ALL-CAPS words. Scores are stored as a tuple so cached values
+    can't be mutated by callers.
+    """
+    return tuple(_ANALYZER.polarity_scores(text).items())
+
+
+class EmotionStatsAccumulator:
+    """
+    Running emotion statistics for a live session
+    
+    Each sample is counted as it arrives, so a snapshot costs O(distinct
+    emotions) instead of re-scanning the full history. Snapshots match
+    EmotionAnalyzer.calculate_statistics over the same samples.
+    """
+    
+    __slots__ = ("counts", "total")
+    
+    def __init__(self):
+        """Start with no samples"""
+        self.counts: Counter = Counter()
+        self.total = 0
+    
+    def add(self, emotion: str):
+        """Count one detected emotion"""
+        self.counts[emotion] += 1
+        self.total += 1
+    
+    def extend(self, emotions: List[str]):
+        """Count a batch of detected emotions"""
+        self.counts.update(emotions)
+        self.total += len(emotions)
+    
+    def snapshot(self) -> Dict[str, any]:
+        """
+        Current statistics
+        
+        Returns:
+            Dict containing emotion statistics
+        """
+        total = self.total or 1
+        scale = 100.0 / total  # one division instead of one per emotion
+        
+        return {
+            "total_samples": total,
+            "emotion_counts": dict(self.counts),
+            "emotion_percentages": {
+                emotion: count * scale
+                for emotion, count in self.counts.items()
+            },
+            "dominant_emotion": self.counts.most_common(1)[0][0] if self.counts else "neutral"
+        }
+
+
 class EmotionAnalyzer:
     """Service for analyzing emotions and detecting mismatches"""
     
+    # Text sentiment by compound band: below -0.05, in between, at/above 0.05
+    _SENTIMENTS = ("negative", "neutral", "positive")
+    
+    # Map facial emotion to expected sentiment
+    _EMOTION_TO_SENTIMENT = MappingProxyType({
+        "happy": "positive",
+        "surprised": "positive",  # Can be positive in medical context
+        "neutral": "neutral",
+        "sad": "negative",
+        "angry": "negative",
+        "fearful": "negative",
+        "disgusted": "negative"
+    })
+    
+    # (text sentiment, expected sentiment) pairs that count as a mismatch
+    _MISMATCH_TABLE = MappingProxyType({
+        ("positive", "negative"): "positive_words_negative_face",
+        ("negative", "positive"): "negative_words_positive_face"
+    })
+    
     def __init__(self):
         """Initialize emotion analyzer"""
         self.emotion_categories = [
             "neutral", "happy", "sad", "angry",
             "fearful", "disgusted", "surprised"
         ]
-        # Initialize sentiment analyzer
-        self.sentiment_analyzer = SentimentIntensityAnalyzer()
+        # Shared sentiment analyzer (lexicon is loaded once at import)
+        self.sentiment_analyzer = _ANALYZER
     
     def analyze_mismatch(
         self,
@@ -28,49 +115,38 @@ class EmotionAnalyzer:
 
         Args:
             message: User's text message
-            detected_emotion: Emotion detected from face-api.js
+            detected_emotion: Emotion detected from face-api.js (lowercase)
 
         Returns:
             Dict containing mismatch analysis and context
         """
-        # Analyze text sentiment using VADER
-        sentiment_scores = self.sentiment_analyzer.polarity_scores(message)
+        # Too short to carry sentiment ("", "k", "ok", "?") - skip VADER
+        if len(message.strip()) < 3:
+            return {
+                "mismatch_detected": False,
+                "text_sentiment": "neutral",
+                "detected_emotion": detected_emotion,
+                "expected_sentiment": self._EMOTION_TO_SENTIMENT.get(detected_emotion, "neutral"),
+                "mismatch_type": None,
+                "confidence": 0.0,
+                "sentiment_scores": {"neg": 0.0, "neu": 1.0, "pos": 0.0, "compound": 0.0}
+            }
+
+        # Analyze text sentiment using VADER (cached per distinct message)
+        sentiment_scores = dict(_vader_scores(message))
 
-        # Determine text sentiment based on compound score
+        # Determine text sentiment based on compound score (+/-0.05 bands)
         compound = sentiment_scores['compound']
-        if compound >= 0.05:
-            text_sentiment = "positive"
-        elif compound <= -0.05:
-            text_sentiment = "negative"
-        else:
-            text_sentiment = "neutral"
-
-        # Map facial emotion to expected sentiment
-        emotion_to_sentiment = {
-            "happy": "positive",
-            "surprised": "positive",  # Can be positive in medical context
-            "neutral": "neutral",
-            "sad": "negative",
-            "angry": "negative",
-            "fearful": "negative",
-            "disgusted": "negative"
-        }
+        text_sentiment = self._SENTIMENTS[(compound >= 0.05) - (compound <= -0.05) + 1]
 
-        expected_sentiment = emotion_to_sentiment.get(detected_emotion.lower(), "neutral")
+        expected_sentiment = self._EMOTION_TO_SENTIMENT.get(detected_emotion, "neutral")
 
         # Detect mismatch (e.g., positive words + negative face, or vice versa)
-        has_mismatch = False
-        mismatch_type = None
-
-        if text_sentiment == "positive" and expected_sentiment == "negative":
-            has_mismatch = True
-            mismatch_type = "positive_words_negative_face"
-        elif text_sentiment == "negative" and expected_sentiment == "positive":
-            has_mismatch = True
-            mismatch_type = "negative_words_positive_face"
+        mismatch_type = self._MISMATCH_TABLE.get((text_sentiment, expected_sentiment))
+        has_mismatch = mismatch_type is not None
 
         # Calculate confidence based on sentiment strength
-        confidence = abs(compound)
+        confidence = compound if compound >= 0 else -compound
 
         return {
             "mismatch_detected": has_mismatch,
@@ -86,29 +162,31 @@ class EmotionAnalyzer:
         self,
         emotions: List[str],
         timestamps: List[str]
-    ) -> List[Dict]:
+    ) -> Dict[str, List[str]]:
         """
         Generate emotion chart data for visualization
         
+        Columnar (parallel arrays) rather than one object per sample:
+        half the objects to build and encode, and it maps directly onto
+        Chart.js labels/data.
+        
         Args:
             emotions: List of detected emotions
             timestamps: Corresponding timestamps
             
         Returns:
-            Chart data in format suitable for frontend visualization
+            Dict with equal-length 'timestamps' and 'emotions' lists
         """
         # TODO: Implement chart data generation
         # - Aggregate emotions over time
         # - Calculate percentages
-        # - Format for chart library (e.g., Chart.js)
         
-        return [
-            {
-                "timestamp": timestamp,
-                "emotion": emotion
-            }
-            for timestamp, emotion in zip(timestamps, emotions)
-        ]
+        # Trim to the shorter list so the columns stay aligned
+        n = min(len(emotions), len(timestamps))
+        return {
+            "timestamps": list(timestamps[:n]),
+            "emotions": list(emotions[:n])
+        }
     
     def calculate_statistics(self, emotions: List[str]) -> Dict[str, any]:
         """
@@ -120,27 +198,24 @@ class EmotionAnalyzer:
         Returns:
             Dict containing emotion statistics
         """
-        # TODO: Implement statistics calculation
-        # - Count emotion frequencies
-        # - Calculate percentages
-        # - Identify dominant emotions
-        # - Detect emotion transitions
+        # TODO: Detect emotion transitions
         
-        emotion_counts = {}
-        for emotion in emotions:
-            emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
+        # Same code path as live sessions, so the two can't drift apart
+        accumulator = EmotionStatsAccumulator()
+        accumulator.extend(emotions)
+        return accumulator.snapshot()
+    
+    def make_accumulator(self) -> EmotionStatsAccumulator:
+        """
+        Create an incremental statistics tracker for a live session
         
-        total = len(emotions) if emotions else 1
+        Prefer this over calling calculate_statistics on the growing
+        history each time a new sample arrives.
         
-        return {
-            "total_samples": total,
-            "emotion_counts": emotion_counts,
-            "emotion_percentages": {
-                emotion: (count / total) * 100
-                for emotion, count in emotion_counts.items()
-            },
-            "dominant_emotion": max(emotion_counts, key=emotion_counts.get) if emotion_counts else "neutral"
-        }
+        Returns:
+            Empty EmotionStatsAccumulator
+        """
+        return EmotionStatsAccumulator()
     
     def detect_emotion_transition(
         self,
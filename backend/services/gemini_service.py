@@ -2,77 +2,222 @@
 Gemini AI service - handles Google Gemini API interactions
 """
 import os
-from typing import Dict, List, Optional
-import google.generativeai as genai
+import json
+import time
+import threading
+import asyncio
+import hashlib
+import re
+import logging
+from collections import OrderedDict, deque
+from random import choice
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+import httpx
+from google import genai
+from google.genai import types
+from google.genai.errors import APIError
+from services.retry import retry_with_backoff
+from services.single_flight import SingleFlight
+
+
+log = logging.getLogger(__name__)
+
+
+# Marker the model appends when it's wrapping up the consultation
+_END_TAG = "[END_CONSULTATION]"
+
+# Generic follow-ups used when Gemini blocks a reply or returns no text
+_BLOCKED_FALLBACKS = (
+    "I understand. Can you tell me more about that?",
+    "I see. What else have you been experiencing?",
+    "Tell me more about how you've been feeling.",
+    "I see. Could you tell me more about your symptoms?"
+)
+
+# Static instructions for the summary call; the transcript is appended
+_SUMMARY_PROMPT = """You are an experienced physician documenting a patient consultation. Write a clinical summary and a treatment plan.
+
+OVERVIEW - a professional medical summary (3-4 sentences) that includes:
+1. Patient age/demographics and chief complaint
+2. Your clinical assessment and likely diagnosis (consider age-specific conditions)
+3. Key findings from the consultation
+4. Overall prognosis or expected outcome
+
+TONE: Professional but clear. Write like you're documenting in a medical chart for another healthcare provider. Write in complete sentences.
+
+RECOMMENDATIONS - 4-5 specific, actionable recommendations that cover:
+- Medications (with dosages and frequency if applicable)
+- Lifestyle modifications or home remedies (age-appropriate)
+- Symptom monitoring or warning signs to watch for
+- Follow-up timeline or when to seek additional care
+- Preventive measures for the future
+
+REQUIREMENTS:
+- Be specific and detailed (e.g., "Take 400mg ibuprofen every 6 hours" not just "Take pain medication")
+- Show medical expertise in your recommendations
+- Each recommendation should be practical and immediately actionable
+- Start each recommendation naturally (e.g., "Take...", "Apply...", "Monitor for...", "Follow up if...")
+- One recommendation per list item, with no numbering or bullets
+- Write with confidence - you're the doctor giving clear instructions
+
+IMPORTANT: Pay attention to the patient's age group in the transcript. Tailor your diagnosis and recommendations to it.
+- Teenagers: posture issues, stress, growth-related; posture correction, stress management, sleep hygiene, screen time
+- Young adults: lifestyle, work stress, ergonomics; work-life balance, exercise routines, hydration
+- Middle-aged: chronic conditions, preventive care; preventive screening, chronic disease management, stress reduction
+- Seniors/Elderly: age-related degeneration, medication considerations; medication safety, fall prevention, mobility aids, regular monitoring
+
+FORMAT: Plain text inside each field. NO markdown, NO asterisks, NO special formatting.
+
+Consultation Transcript:
+"""
+
+# Transcript speaker labels by message role
+_ROLE_LABELS = {"user": "Patient"}
+
+# Folds exchanges trimmed from the chat history into a running synopsis
+_SYNOPSIS_PROMPT = """Summarize this earlier part of a doctor-patient consultation in one or two plain sentences. Keep the chief complaint, key symptoms and findings, the patient's age group, and any advice already given.
+
+"""
+
+# Patient replies that only close out the consultation ("No, I'm good. Thanks!").
+# Words are joined by required separators so the match stays linear.
+_CLOSING_WORD = (
+    r"(?:no(?:pe)?|nah|i['’]?m (?:good|fine|all set)|that['’]?s (?:all|it)"
+    r"|thanks?(?: you)?(?: so much| very much)?|(?:good ?)?bye)"
+)
+_CLOSING_RE = re.compile(
+    rf"^\s*{_CLOSING_WORD}(?:[\s.,!]+{_CLOSING_WORD})*[\s.,!]*$",
+    re.IGNORECASE
+)
+_CLOSING_REPLY = "You're welcome! Take care and feel better soon."
+
+# The system prompt's sign-off question ("Anything else I can help with?")
+_SIGNOFF_QUESTION_RE = re.compile(r"anything else (?:i can|to) help", re.IGNORECASE)
+
+# Rough English average, good enough to budget history without a count_tokens call
+_CHARS_PER_TOKEN = 4
+
+# Age-appropriate diagnostic guidance injected into each chat turn
+_AGE_GUIDANCE = {
+    "Child": "CRITICAL: Age-specific diagnosis required. Common causes at this age: viral infections, growing pains, minor injuries from play. Avoid adult medications. Use simple language and consider parental involvement.",
+    
+    "Teenager": "CRITICAL: Age-specific diagnosis required. Most likely causes: poor posture from desk/phone use, sports injuries, stress/anxiety from school, hormonal changes, irregular sleep patterns, inadequate nutrition. Think about academic pressure and growth spurts.",
+    
+    "Young Adult": "CRITICAL: Age-specific diagnosis required. Most likely causes: work-related stress, poor ergonomics (desk job), irregular sleep, inadequate exercise, poor diet, dehydration, lifestyle factors (alcohol, caffeine). Consider career stress and lifestyle habits first.",
+    
+    "Middle-Aged": "CRITICAL: Age-specific diagnosis required. Most likely causes: chronic stress, sedentary lifestyle, weight-related issues, early signs of age-related conditions (hypertension, diabetes), work-life balance issues. Consider family history and preventive screening needs.",
+    
+    "Senior": "CRITICAL: Age-specific diagnosis required. Most likely causes: arthritis, age-related degeneration, medication side effects, reduced mobility, chronic conditions. Ask about current medications and existing conditions. Consider fall risks and mobility limitations.",
+    
+    "Elderly": "CRITICAL: Age-specific diagnosis required. Most likely causes: multiple chronic conditions, medication interactions, reduced healing capacity, balance issues, cognitive factors. Be extra thorough about medication review and consider caregiver involvement."
+}
+
+# Safety settings - allow medical content
+_SAFETY_SETTINGS = (
+    types.SafetySetting(
+        category="HARM_CATEGORY_HARASSMENT",
+        threshold="BLOCK_NONE"
+    ),
+    types.SafetySetting(
+        category="HARM_CATEGORY_HATE_SPEECH",
+        threshold="BLOCK_NONE"
+    ),
+    types.SafetySetting(
+        category="HARM_CATEGORY_SEXUALLY_EXPLICIT",
+        threshold="BLOCK_MEDIUM_AND_ABOVE"
+    ),
+    types.SafetySetting(
+        category="HARM_CATEGORY_DANGEROUS_CONTENT",
+        threshold="BLOCK_NONE"  # Allow medical discussions
+    ),
+)
+
+# Chat config, tuned for speed and natural responses
+_CHAT_CONFIG = types.GenerateContentConfig(
+    temperature=0.7,
+    top_p=0.95,
+    top_k=40,
+    max_output_tokens=1500,  # Allow longer responses for complete thoughts
+    candidate_count=1,
+    safety_settings=_SAFETY_SETTINGS
+)
+
+# Short, deterministic synopses of trimmed chat history (no thinking budget,
+# so the whole output allowance goes to the sentence itself)
+_SYNOPSIS_CONFIG = types.GenerateContentConfig(
+    temperature=0.2,
+    max_output_tokens=200,
+    candidate_count=1,
+    safety_settings=_SAFETY_SETTINGS,
+    thinking_config=types.ThinkingConfig(thinking_budget=0)
+)
+
+# Separate config for summaries, returning structured JSON
+_SUMMARY_CONFIG = types.GenerateContentConfig(
+    temperature=0.5,
+    top_p=0.95,
+    top_k=40,
+    max_output_tokens=3000,  # Overview and recommendations in one response
+    candidate_count=1,
+    safety_settings=_SAFETY_SETTINGS,
+    response_mime_type="application/json",
+    response_schema={
+        "type": "object",
+        "properties": {
+            "overview": {"type": "string"},
+            "recommendations": {"type": "array", "items": {"type": "string"}}
+        },
+        "required": ["overview", "recommendations"]
+    }
+)
 
 
 class GeminiService:
     """Service for interacting with Google Gemini API"""
 
+    # Initialize the model with faster configuration
+    # Using gemini-2.5-flash for lower latency (vs gemini-2.5-pro)
+    model_name = "gemini-2.5-flash"
+    
+    # The client (and its HTTP connection pool) holds no conversation state,
+    # so every instance (one per router) shares one built on first use
+    _shared: Optional[genai.Client] = None
+    _shared_lock = threading.Lock()
+    _transport: Optional[httpx.AsyncHTTPTransport] = None
+
     def __init__(self):
         """Initialize Gemini service with API key"""
         self.api_key = os.getenv("GEMINI_API_KEY")
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY environment variable not set")
 
-        # Configure Gemini API
-        genai.configure(api_key=self.api_key)
-
-        # Initialize the model with faster configuration
-        # Using gemini-2.5-flash for lower latency (vs gemini-2.5-pro)
-        self.model_name = "gemini-2.5-flash"
+        # Gemini client (shared across instances) and module-level request configs
+        self.client = self._get_shared(self.api_key)
+        self.chat_config = _CHAT_CONFIG
+        self.summary_config = _SUMMARY_CONFIG
         
-        # Configure for speed and natural responses
-        generation_config = {
-            "temperature": 0.7,
-            "top_p": 0.95,
-            "top_k": 40,
-            "max_output_tokens": 1500,  # Allow longer responses for complete thoughts
-            "candidate_count": 1,
-        }
-        
-        # Safety settings - allow medical content
-        safety_settings = [
-            {
-                "category": "HARM_CATEGORY_HARASSMENT",
-                "threshold": "BLOCK_NONE"
-            },
-            {
-                "category": "HARM_CATEGORY_HATE_SPEECH",
-                "threshold": "BLOCK_NONE"
-            },
-            {
-                "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-            },
-            {
-                "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
-                "threshold": "BLOCK_NONE"  # Allow medical discussions
-            },
-        ]
-        
-        self.model = genai.GenerativeModel(
-            self.model_name,
-            generation_config=generation_config,
-            safety_settings=safety_settings
-        )
+        # Cap concurrent in-flight Gemini calls (tunable via env) so bursts
+        # don't trip provider rate limits
+        self._semaphore = asyncio.Semaphore(int(os.getenv("GEMINI_MAX_CONCURRENCY", "64")))
         
-        # Separate model for summaries with higher token limit
-        summary_config = {
-            "temperature": 0.5,
-            "top_p": 0.95,
-            "top_k": 40,
-            "max_output_tokens": 1800,  # Higher limit for detailed summaries
-            "candidate_count": 1,
-        }
-        self.summary_model = genai.GenerativeModel(
-            self.model_name,
-            generation_config=summary_config,
-            safety_settings=safety_settings
-        )
-        
-        self.conversation_history = []
+        # Recent turns only; the SDK chat session holds the full history and
+        # /api/insights receives the transcript from the client
+        self.conversation_history = deque(maxlen=12)
+        self._user_turns = 0  # Patient messages sent, including evicted ones
         self.chat_session = None  # Will be initialized on first use
+        # Oldest exchanges are dropped from the chat once its history is
+        # estimated to exceed this many tokens (re-sent on every turn)
+        self._history_token_budget = int(os.getenv("GEMINI_HISTORY_TOKEN_BUDGET", "2000"))
+        # One-sentence recap of the exchanges trimmed so far
+        self._history_synopsis = ""
+        # Turns on the shared chat session must not interleave
+        self._chat_lock = asyncio.Lock()
+        # Concurrent summaries of the same transcript share one Gemini call
+        self._summary_flight = SingleFlight()
+        # Finished summaries by transcript key -> (stored_at, summary)
+        self._summary_cache: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._summary_cache_size = 64
+        self._summary_cache_ttl = 3600.0  # seconds
         self.system_message = """You're an experienced, knowledgeable doctor having a direct conversation with your patient. You have extensive medical training and can diagnose and treat common conditions confidently. Talk naturally but showcase your medical expertise.
 
 CORE IDENTITY:
@@ -158,6 +303,47 @@ You: "Perfect. Feel better soon, and remember those screen breaks! [END_CONSULTA
 
 Remember: You're a confident, knowledgeable doctor. Show your expertise through targeted questions and clear, specific treatment plans."""
 
+    @classmethod
+    def _get_shared(cls, api_key: str) -> genai.Client:
+        """
+        Build the Gemini client and its connection pool once per process
+        
+        Args:
+            api_key: Gemini API key
+            
+        Returns:
+            Shared genai.Client
+        """
+        with cls._shared_lock:
+            if cls._shared is not None:
+                return cls._shared
+            
+            # One tuned HTTP/2 connection pool for every Gemini request, so
+            # concurrent turns multiplex over warm TLS connections (passing a
+            # transport also pins the SDK to httpx)
+            cls._transport = httpx.AsyncHTTPTransport(
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=100,
+                    max_keepalive_connections=20,
+                    keepalive_expiry=30.0
+                ),
+                retries=2  # connection failures only
+            )
+            cls._shared = genai.Client(
+                api_key=api_key,
+                http_options=types.HttpOptions(
+                    async_client_args={"transport": cls._transport}
+                )
+            )
+            return cls._shared
+
+    @classmethod
+    async def aclose(cls):
+        """Close the shared Gemini connection pool"""
+        if cls._transport is not None:
+            await cls._transport.aclose()
+
     async def get_response(
         self,
         message: str,
@@ -180,177 +366,404 @@ Remember: You're a confident, knowledgeable doctor. Show your expertise through
             Dict containing response text and metadata
         """
         try:
-            # Initialize chat session if not exists
-            if self.chat_session is None:
-                # Start chat with system message as first exchange
-                self.chat_session = self.model.start_chat(history=[
-                    {"role": "user", "parts": [self.system_message]},
-                    {"role": "model", "parts": ["Got it. I'll keep things casual and brief, ask a couple questions to understand what's going on, then give straightforward advice. No formal lists or long explanations, just natural conversation."]}
-                ])
+            closing = self._local_closing(message)
+            if closing is not None:
+                return closing
+            
+            self._ensure_chat_session()
 
             # Build context-aware message with emotion, age, and conversation stage
             contextual_message = self._build_contextual_message(message, emotion, age, age_category, emotion_context)
             
             # Send message to chat
-            response = self.chat_session.send_message(contextual_message)
+            async with self._chat_lock:
+                await self._trim_chat_history()
+                response = await self._call_gemini(
+                    self.chat_session.send_message, contextual_message
+                )
+
+            # Extract response text safely (None when blocked or empty)
+            response_text = (response.text or "").strip()
+            if response_text:
+                log.debug("Gemini response: %s", response_text[:80])
+            else:
+                log.warning("Gemini response blocked. Candidates: %s", response.candidates)
+                response_text = self._blocked_fallback()
 
-            # Extract response text safely
-            try:
-                response_text = response.text.strip()
-                print(f"✓ Got response from Gemini: {response_text[:80]}...")
-            except (IndexError, AttributeError):
-                # Response was blocked or empty
-                print(f"Response blocked. Candidates: {response.candidates}")
-                fallback_responses = [
-                    "I understand. Can you tell me more about that?",
-                    "I see. What else have you been experiencing?",
-                    "Tell me more about how you've been feeling.",
-                    "I see. Could you tell me more about your symptoms?"
-                ]
-                import random
-                response_text = random.choice(fallback_responses)
+            return self._finish_turn(message, response_text)
+
+        except Exception as e:
+            return self._error_response(e)
+
+    async def stream_response(
+        self,
+        message: str,
+        emotion: str,
+        age: Optional[int] = None,
+        age_category: Optional[str] = None,
+        emotion_context: Optional[Dict] = None
+    ) -> AsyncIterator[Dict[str, any]]:
+        """
+        Stream the AI response as it is generated
+        
+        Takes the same arguments as get_response. The [END_CONSULTATION]
+        tag is held back and stripped even when it arrives split across
+        chunks, so only patient-facing text is ever yielded.
+
+        Yields:
+            {"delta": str} events with response text, then one final event
+            with the get_response metadata ("text", "followup_needed", ...)
+            and "done": True. If the stream fails after text was sent, the
+            final event is {"done": True, "error": True} with no replacement
+            text, and the client decides whether to keep the partial reply.
+        """
+        tag = _END_TAG
+        parts = []
+        shown = []  # Deltas actually sent to the client
+        pending = ""
+        started = False
 
-            # Check if AI is signaling end of consultation
-            should_end = "[END_CONSULTATION]" in response_text
+        try:
+            closing = self._local_closing(message)
+            if closing is not None:
+                yield {"delta": closing["text"]}
+                yield {"done": True, **closing}
+                return
             
-            # Remove the tag from the response text (don't show to user)
-            clean_response = response_text.replace("[END_CONSULTATION]", "").strip()
+            self._ensure_chat_session()
+            contextual_message = self._build_contextual_message(message, emotion, age, age_category, emotion_context)
 
-            # Add to our history for tracking
-            self._add_to_history("user", message)
-            self._add_to_history("assistant", clean_response)
+            # Hold the chat lock and a Gemini slot for the life of the stream.
+            # The SDK only records the exchange in the chat history once the
+            # stream is fully consumed, so an aborted stream leaves no trace.
+            async with self._chat_lock:
+                await self._trim_chat_history()
+                async with self._semaphore:
+                    # Rate limits surface on the first chunk, so retry up to there
+                    chunk, chunks = await self._with_retries(
+                        lambda: self._start_stream(contextual_message)
+                    )
+                    while chunk is not None:
+                        text = chunk.text or ""  # None for blocked or empty chunks
+                        parts.append(text)
+
+                        # Drop whole tags, keep back a possible partial tag at the end
+                        pending = (pending + text).replace(tag, "")
+                        keep = next(
+                            (n for n in range(min(len(tag) - 1, len(pending)), 0, -1)
+                             if pending.endswith(tag[:n])),
+                            0
+                        )
+                        delta, pending = pending[:len(pending) - keep], pending[len(pending) - keep:]
+                        if not started:
+                            delta = delta.lstrip()
+                        if delta:
+                            started = True
+                            shown.append(delta)
+                            yield {"delta": delta}
+                        
+                        chunk = await anext(chunks, None)
+
+            response_text = "".join(parts).strip()
+            if response_text:
+                log.debug("Gemini streamed response: %s", response_text[:80])
+            else:
+                log.warning("Gemini streamed response blocked or empty")
+                response_text = self._blocked_fallback()
+                pending = response_text
 
-            # Determine if follow-up is needed
-            followup_needed = "?" in clean_response or len(self.conversation_history) < 6
+            if pending.strip():
+                yield {"delta": pending.rstrip() if started else pending.strip()}
 
-            return {
-                "text": clean_response,
-                "followup_needed": followup_needed,
-                "should_end_consultation": should_end
-            }
+            yield {"done": True, **self._finish_turn(message, response_text)}
 
         except Exception as e:
-            # Log error and return fallback response with more details
-            import traceback
-            print(f"Error calling Gemini API: {str(e)}")
-            print(traceback.format_exc())
-            
-            # Return a contextual fallback based on conversation history
-            if len(self.conversation_history) > 0:
-                fallback = "I see. Could you tell me more about your symptoms?"
-            else:
-                fallback = "Hello! I'm here to help. What brings you in today?"
+            result = self._error_response(e)
+            if started:
+                # The partial reply can't be retracted, so record what the
+                # patient actually saw and flag the stream as cut short
+                self._add_to_history("user", message)
+                self._add_to_history("assistant", "".join(shown).strip())
+                yield {"done": True, "error": True}
+                return
             
-            return {
-                "text": fallback,
-                "followup_needed": True,
-                "error": str(e)
+            yield {"delta": result["text"]}
+            # Same fields as /api/chat; raw error text stays in the server log
+            yield {
+                "done": True,
+                "text": result["text"],
+                "followup_needed": result["followup_needed"],
+                "should_end_consultation": False
             }
 
-    async def generate_summary(self, conversation: List[Dict]) -> Dict[str, any]:
+    def _local_closing(self, message: str) -> Optional[Dict[str, any]]:
         """
-        Generate structured conversation summary using Gemini
-
+        Close the consultation locally when the patient is just signing off
+        
+        Only applies once the doctor has asked the sign-off question ("Anything
+        else I can help with?") and the patient's whole reply is a sign-off ("nope", "that's all,
+        thanks"), so the final [END_CONSULTATION] turn skips a Gemini call.
+        
         Args:
-            conversation: List of conversation messages
-
+            message: User's message text
+            
         Returns:
-            Dict with 'overview' and 'recommendations' keys
+            The closing response dict, or None to ask Gemini as usual
+        """
+        if self._user_turns < 2 or not self.conversation_history:
+            return None
+        last = self.conversation_history[-1]
+        if last["role"] != "assistant" or not _SIGNOFF_QUESTION_RE.search(last["content"]):
+            return None
+        if not _CLOSING_RE.match(message):
+            return None
+        
+        result = self._finish_turn(message, _CLOSING_REPLY + " " + _END_TAG)
+        result["followup_needed"] = False
+        return result
+
+    def _ensure_chat_session(self):
+        """Start the chat session with the system message on first use"""
+        if self.chat_session is None:
+            self.chat_session = self._new_chat_session()
+
+    def _new_chat_session(self, history: Optional[List[types.Content]] = None):
+        """Create a chat session, optionally seeded with earlier turns"""
+        # System message goes in the dedicated system slot, not as a fake
+        # first exchange, so the history holds only real turns
+        system_instruction = self.system_message
+        if self._history_synopsis:
+            system_instruction += f"\n\nCONSULTATION SO FAR: {self._history_synopsis}"
+        
+        return self.client.aio.chats.create(
+            model=self.model_name,
+            config=self.chat_config.model_copy(
+                update={"system_instruction": system_instruction}
+            ),
+            history=history
+        )
+
+    async def _trim_chat_history(self):
         """
+        Compact the chat history once it is over its token budget
+        
+        The whole history is re-sent with every turn, so this bounds the
+        per-turn input size. Tokens are estimated from character counts.
+        Once over budget, the oldest exchanges are cut down to half the
+        budget (so this runs every few turns, not every turn) and folded
+        into a short synopsis carried in the system instruction; the most
+        recent turn is always kept. Call with the chat lock held.
+        """
+        history = self.chat_session.get_history(curated=True)
+        
+        # Group into turns: each user content plus every model content after
+        # it (streamed replies are recorded as one model content per chunk)
+        turn_starts = []
+        turn_sizes = []
+        for i, content in enumerate(history):
+            size = sum(len(part.text or "") for part in content.parts or ()) // _CHARS_PER_TOKEN
+            if content.role == "user" or not turn_starts:
+                turn_starts.append(i)
+                turn_sizes.append(0)
+            turn_sizes[-1] += size
+        
+        total = sum(turn_sizes)
+        if total <= self._history_token_budget:
+            return
+        
+        # Drop whole turns from the front, always keeping the latest one
+        dropped = 0
+        while total > self._history_token_budget // 2 and len(turn_starts) - dropped > 1:
+            total -= turn_sizes[dropped]
+            dropped += 1
+        
+        if dropped:
+            start = turn_starts[dropped]
+            await self._update_synopsis(history[:start])
+            self.chat_session = self._new_chat_session(history[start:])
+
+    async def _update_synopsis(self, dropped: List[types.Content]):
+        """
+        Fold trimmed exchanges into the running history synopsis
+        
+        Args:
+            dropped: Oldest whole turns being removed from the chat history
+        """
+        # One line per speaker turn; a streamed reply spans several contents
+        lines = []
+        last_role = None
+        for content in dropped:
+            text = "".join(part.text for part in content.parts or () if part.text)
+            if content.role == last_role:
+                lines[-1] += text
+            else:
+                lines.append(f"{_ROLE_LABELS.get(content.role, 'Doctor')}: {text}")
+                last_role = content.role
+        transcript = "\n".join(lines)
+        if self._history_synopsis:
+            transcript = f"Earlier summary: {self._history_synopsis}\n{transcript}"
+        
         try:
-            # Format conversation for summarization
-            conversation_text = []
-            for msg in conversation:
-                # Handle both dict and object formats
-                role = "Patient" if (msg.get("role") if isinstance(msg, dict) else msg.role) == "user" else "Doctor"
-                content = msg.get("content") if isinstance(msg, dict) else msg.content
-                conversation_text.append(f"{role}: {content}")
+            response = await self._call_gemini(
+                self.client.aio.models.generate_content,
+                model=self.model_name,
+                contents=_SYNOPSIS_PROMPT + transcript,
+                config=_SYNOPSIS_CONFIG
+            )
+            synopsis = (response.text or "").strip()
+        except Exception as e:
+            log.warning("History synopsis failed, trimming without it: %s", e)
+            return
+        
+        # Keep the previous synopsis rather than blanking it on an empty reply
+        if synopsis:
+            self._history_synopsis = synopsis
 
-            formatted_conversation = "\n".join(conversation_text)
+    async def _start_stream(self, message: str):
+        """Open a chat stream and pull its first chunk (where API errors surface)"""
+        chunks = await self.chat_session.send_message_stream(message)
+        first_chunk = await anext(chunks, None)
+        return first_chunk, chunks
 
-            # Build summarization prompt for overview
-            overview_prompt = f"""You are an experienced physician writing a clinical summary of a patient consultation.
+    def _blocked_fallback(self) -> str:
+        """Generic follow-up to use when Gemini blocks or returns no text"""
+        return choice(_BLOCKED_FALLBACKS)
 
-Write a professional medical summary (3-4 sentences) that includes:
-1. Patient age/demographics and chief complaint
-2. Your clinical assessment and likely diagnosis (consider age-specific conditions)
-3. Key findings from the consultation
-4. Overall prognosis or expected outcome
+    def _finish_turn(self, message: str, response_text: str) -> Dict[str, any]:
+        """
+        Record a completed exchange and build the response metadata
 
-IMPORTANT: Pay attention to the patient's age group in the transcript. Tailor your diagnosis to age-appropriate conditions.
-- Teenagers: posture issues, stress, growth-related
-- Young adults: lifestyle, work stress, ergonomics
-- Middle-aged: chronic conditions, preventive care
-- Seniors/Elderly: age-related degeneration, medication considerations
+        Args:
+            message: User's message text
+            response_text: Full model reply, possibly with the end tag
 
-TONE: Professional but clear. Write like you're documenting in a medical chart for another healthcare provider.
-FORMAT: Plain text only. NO markdown, NO asterisks, NO special formatting. Write in complete sentences.
+        Returns:
+            Dict containing response text and metadata
+        """
+        # Check if AI is signaling end of consultation, and remove the tag
+        # from the response text (don't show to user) in the same pass
+        head, tag, tail = response_text.partition(_END_TAG)
+        should_end = bool(tag)
+        clean_response = (head + tail.replace(_END_TAG, "")).strip() if tag else response_text.strip()
+
+        # Add to our history for tracking
+        self._add_to_history("user", message)
+        self._add_to_history("assistant", clean_response)
+
+        # Determine if follow-up is needed
+        followup_needed = "?" in clean_response or len(self.conversation_history) < 6
+
+        return {
+            "text": clean_response,
+            "followup_needed": followup_needed,
+            "should_end_consultation": should_end
+        }
 
-Consultation Transcript:
-{formatted_conversation}
+    def _error_response(self, e: Exception) -> Dict[str, any]:
+        """Log a failed turn and build a contextual fallback response"""
+        # Log error (with traceback) and return fallback response
+        log.exception("Error calling Gemini API: %s", e)
+        
+        # Return a contextual fallback based on conversation history
+        if len(self.conversation_history) > 0:
+            fallback = "I see. Could you tell me more about your symptoms?"
+        else:
+            fallback = "Hello! I'm here to help. What brings you in today?"
+        
+        return {
+            "text": fallback,
+            "followup_needed": True,
+            "error": str(e)
+        }
 
-Clinical Summary:"""
+    async def generate_summary(self, conversation: List[Dict]) -> Dict[str, any]:
+        """
+        Generate structured conversation summary using Gemini
 
-            # Build prompt for recommendations
-            recommendations_prompt = f"""You are an experienced physician creating a treatment plan based on this consultation.
+        Args:
+            conversation: List of conversation messages
 
-Provide 4-5 specific, actionable recommendations that cover:
-- Medications (with dosages and frequency if applicable)
-- Lifestyle modifications or home remedies (age-appropriate)
-- Symptom monitoring or warning signs to watch for
-- Follow-up timeline or when to seek additional care
-- Preventive measures for the future
+        Returns:
+            Dict with 'overview' and 'recommendations' keys
+        """
+        # Nothing to summarize - skip the Gemini call for an empty transcript
+        if not conversation:
+            return {
+                "overview": "No conversation data available.",
+                "recommendations": []
+            }
+        
+        # Format conversation for summarization
+        formatted_conversation = "\n".join(
+            f"{role}: {content}" for role, content in map(self._normalize, conversation)
+        )
 
-REQUIREMENTS:
-- Be specific and detailed (e.g., "Take 400mg ibuprofen every 6 hours" not just "Take pain medication")
-- Show medical expertise in your recommendations
-- TAILOR recommendations to patient's age group (check transcript for age context)
-- Each recommendation should be practical and immediately actionable
-- Write in plain text, NO markdown, NO asterisks, NO bold text
-- Start each recommendation naturally (e.g., "Take...", "Apply...", "Monitor for...", "Follow up if...")
-- Separate each recommendation with a line break
-- Write with confidence - you're the doctor giving clear instructions
+        # Key on the transcript with case/whitespace differences collapsed
+        normalized = " ".join(formatted_conversation.split()).casefold()
+        key = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        
+        cached = self._summary_cache_get(key)
+        if cached is not None:
+            return cached
+        
+        # Identical transcripts already being summarized join that call
+        return await self._summary_flight.do(
+            key, lambda: self._summarize(formatted_conversation, key)
+        )
 
-AGE-SPECIFIC CONSIDERATIONS:
-- Teenagers: Focus on posture correction, stress management, sleep hygiene, screen time
-- Young adults: Ergonomics, work-life balance, exercise routines, hydration
-- Middle-aged: Preventive screening, chronic disease management, stress reduction
-- Seniors/Elderly: Medication safety, fall prevention, mobility aids, regular monitoring
+    @staticmethod
+    def _normalize(msg) -> Tuple[str, str]:
+        """Transcript speaker and text for a message (dict or object format)"""
+        if isinstance(msg, dict):
+            role, content = msg.get("role"), msg.get("content")
+        else:
+            role, content = msg.role, msg.content
+        return _ROLE_LABELS.get(role, "Doctor"), content
 
-Consultation Transcript:
-{formatted_conversation}
+    async def _summarize(self, formatted_conversation: str, cache_key: str) -> Dict[str, any]:
+        """
+        Generate the overview and recommendations for a transcript in one call
 
-Treatment Plan:"""
+        Args:
+            formatted_conversation: Transcript as "Patient: ..."/"Doctor: ..." lines
+            cache_key: Summary cache key to store a successful result under
 
-            # Generate both summaries
-            overview_response = self.summary_model.generate_content(overview_prompt)
-            recommendations_response = self.summary_model.generate_content(recommendations_prompt)
+        Returns:
+            Dict with 'overview' and 'recommendations' keys
+        """
+        try:
+            # One prompt for both parts; the transcript is sent once and the
+            # model returns {"overview": ..., "recommendations": [...]}
+            summary_prompt = _SUMMARY_PROMPT + formatted_conversation
+
+            response = await self._call_gemini(
+                self.client.aio.models.generate_content,
+                model=self.model_name,
+                contents=summary_prompt,
+                config=self.summary_config
+            )
             
-            # Extract text safely
+            # Structured output is schema-constrained, but a blocked or
+            # truncated response can still leave it empty or unparseable
             try:
-                overview = overview_response.text.strip()
-            except (IndexError, AttributeError):
-                print(f"Overview generation blocked. Candidates: {overview_response.candidates}")
+                data = json.loads(response.text)
+            except (TypeError, ValueError):
+                data = None
+            if not isinstance(data, dict):
+                log.warning("Summary generation blocked or malformed. Candidates: %s", response.candidates)
+                data = {}
+            
+            overview = str(data.get("overview") or "").strip()
+            complete = bool(overview)
+            if not overview:
                 overview = "Patient presented with health concerns that were assessed during this consultation. Clinical evaluation and recommendations were provided based on reported symptoms."
             
-            try:
-                recommendations_text = recommendations_response.text.strip()
-                # Parse recommendations into list - split by line breaks
-                recommendations = []
-                for line in recommendations_text.split('\n'):
-                    line = line.strip()
-                    # Remove any markdown formatting that might slip through
-                    line = line.replace('**', '').replace('*', '').replace('##', '').replace('#', '')
-                    # Remove numbering/bullets if present
-                    if line and len(line) > 3:  # Ignore very short lines
-                        # Remove common prefixes
-                        for prefix in ['1.', '2.', '3.', '4.', '5.', '-', '•', '●']:
-                            if line.startswith(prefix):
-                                line = line[len(prefix):].strip()
-                        if line:
-                            recommendations.append(line)
-            except (IndexError, AttributeError):
-                print(f"Recommendations generation blocked. Candidates: {recommendations_response.candidates}")
+            recommendations = [
+                item.strip() for item in data.get("recommendations") or []
+                if isinstance(item, str) and item.strip()
+            ]
+            complete = complete and bool(recommendations)
+            if not recommendations:
                 recommendations = [
                     "Follow the treatment plan discussed during your consultation",
                     "Monitor your symptoms closely and note any changes in severity or new symptoms",
@@ -358,15 +771,17 @@ Treatment Plan:"""
                     "Contact for follow-up if symptoms worsen or don't improve within the expected timeframe"
                 ]
             
-            return {
+            summary = {
                 "overview": overview,
                 "recommendations": recommendations
             }
+            # Don't pin a fallback in the cache; a retry may get a real summary
+            if complete:
+                self._summary_cache_put(cache_key, summary)
+            return summary
 
         except Exception as e:
-            import traceback
-            print(f"Error generating summary: {str(e)}")
-            print(traceback.format_exc())
+            log.exception("Error generating summary: %s", e)
             return {
                 "overview": "Clinical summary unavailable. Please refer to the consultation transcript for complete details of the assessment and treatment plan provided.",
                 "recommendations": [
@@ -377,49 +792,46 @@ Treatment Plan:"""
                 ]
             }
 
-    def _build_prompt(
-        self,
-        message: str,
-        emotion: str,
-        emotion_context: Optional[Dict] = None
-    ) -> str:
+    def _summary_cache_get(self, key: str) -> Optional[Dict]:
+        """Return a cached summary that hasn't expired, marking it recently used"""
+        entry = self._summary_cache.get(key)
+        if entry is None:
+            return None
+        stored_at, summary = entry
+        if time.monotonic() - stored_at > self._summary_cache_ttl:
+            del self._summary_cache[key]
+            return None
+        self._summary_cache.move_to_end(key)
+        return summary
+
+    def _summary_cache_put(self, key: str, summary: Dict):
+        """Store a summary, evicting the least recently used over the cap"""
+        self._summary_cache[key] = (time.monotonic(), summary)
+        self._summary_cache.move_to_end(key)
+        while len(self._summary_cache) > self._summary_cache_size:
+            self._summary_cache.popitem(last=False)
+
+    async def _call_gemini(self, fn: Callable, *args, **kwargs):
         """
-        Build prompt with emotion context
-
+        Await a Gemini SDK call on the SDK's native async client
+        
         Args:
-            message: User message
-            emotion: Detected emotion
-            emotion_context: Additional context
-
+            fn: Async SDK method to call (e.g. chat send_message)
+            *args: Positional arguments for the call
+            **kwargs: Keyword arguments for the call
+            
         Returns:
-            Formatted prompt string
+            The SDK response
         """
-        # Start with system prompt
-        prompt_parts = [self.system_prompt]
-
-        # Add conversation history if exists
-        if self.conversation_history:
-            prompt_parts.append("\n\nConversation history:")
-            for msg in self.conversation_history[-6:]:  # Keep last 6 messages for context
-                role = "Patient" if msg["role"] == "user" else "Doctor"
-                prompt_parts.append(f"{role}: {msg['content']}")
-
-        # Add emotion context
-        prompt_parts.append(f"\n\nCurrent patient emotion detected: {emotion}")
-
-        # Add emotion mismatch context if present
-        if emotion_context and emotion_context.get("mismatch_detected"):
-            prompt_parts.append(
-                f"Note: There's a mismatch between what the patient is saying and their facial expression. "
-                f"They appear {emotion} but their words suggest {emotion_context.get('text_sentiment', 'different feelings')}. "
-                f"Consider probing gently to understand their true feelings."
-            )
-
-        # Add current message
-        prompt_parts.append(f"\n\nPatient: {message}")
-        prompt_parts.append("\nDoctor:")
-
-        return "\n".join(prompt_parts)
+        async with self._semaphore:
+            return await self._with_retries(lambda: fn(*args, **kwargs))
+
+    async def _with_retries(self, fn: Callable):
+        """Run a Gemini call, backing off and retrying rate-limit (429) errors"""
+        return await retry_with_backoff(
+            fn,
+            should_retry=lambda e: isinstance(e, APIError) and e.code == 429
+        )
 
     def _build_contextual_message(
         self,
@@ -442,40 +854,39 @@ Treatment Plan:"""
         Returns:
             Contextual message string
         """
-        # Start with the user's message
-        parts = [f'Patient says: "{message}"']
-        
         # Add age context FIRST - it's critical for diagnosis
+        age_seg = ""
         if age_category:
             age_guidance = self._get_age_guidance(age_category)
             if age_guidance:
-                parts.append(f"\n[PATIENT AGE: {age_category}]")
-                parts.append(f"[{age_guidance}]")
-        
-        # Add facial emotion as additional context
-        parts.append(f"[Facial expression: {emotion}]")
+                age_seg = f"\n\n[PATIENT AGE: {age_category}]\n[{age_guidance}]"
         
         # Add conversation stage reminder
-        exchange_count = len([msg for msg in self.conversation_history if msg["role"] == "user"])
+        exchange_count = self._user_turns
+        stage_seg = ""
         if exchange_count >= 2:
-            parts.append(f"[This is exchange #{exchange_count + 1}. You should provide assessment and advice now, not just more questions.]")
+            stage_seg = f"\n[This is exchange #{exchange_count + 1}. You should provide assessment and advice now, not just more questions.]"
         
         # Only flag SIGNIFICANT mismatches (not every small discrepancy)
+        mismatch_seg = ""
         if emotion_context and emotion_context.get("mismatch_detected"):
             confidence = emotion_context.get("confidence", 0)
             
             # Only flag if high confidence mismatch (strong sentiment + clear opposite emotion)
             if confidence > 0.5:  # Significant mismatch threshold
                 mismatch_type = emotion_context.get("mismatch_type", "")
+                # VADER compound score (-1..1) so the model can weigh how strong the words are
+                compound = emotion_context.get("sentiment_scores", {}).get("compound", 0.0)
                 
                 if mismatch_type == "positive_words_negative_face":
                     # Patient claiming to be fine but looks distressed
-                    parts.append(f"[Note: Patient expressing positivity but appears {emotion}. May want to check emotional wellbeing if appropriate.]")
+                    mismatch_seg = f"\n[Note: Patient expressing positivity (text sentiment {compound:+.2f}) but appears {emotion}. May want to check emotional wellbeing if appropriate.]"
                 elif mismatch_type == "negative_words_positive_face":
                     # Patient complaining but looks fine - probably minor issue
-                    parts.append(f"[Note: Patient expressing concerns but appears {emotion}. Likely manageable issue.]")
+                    mismatch_seg = f"\n[Note: Patient expressing concerns (text sentiment {compound:+.2f}) but appears {emotion}. Likely manageable issue.]"
         
-        return "\n".join(parts)
+        # User's message, then the optional segments around the facial emotion
+        return f'Patient says: "{message}"{age_seg}\n[Facial expression: {emotion}]{stage_seg}{mismatch_seg}'
     
     def _get_age_guidance(self, age_category: str) -> str:
         """
@@ -487,20 +898,7 @@ Treatment Plan:"""
         Returns:
             Guidance string for the AI
         """
-        age_guidance_map = {
-            "Child": "CRITICAL: Age-specific diagnosis required. Common causes at this age: viral infections, growing pains, minor injuries from play. Avoid adult medications. Use simple language and consider parental involvement.",
-            
-            "Teenager": "CRITICAL: Age-specific diagnosis required. Most likely causes: poor posture from desk/phone use, sports injuries, stress/anxiety from school, hormonal changes, irregular sleep patterns, inadequate nutrition. Think about academic pressure and growth spurts.",
-            
-            "Young Adult": "CRITICAL: Age-specific diagnosis required. Most likely causes: work-related stress, poor ergonomics (desk job), irregular sleep, inadequate exercise, poor diet, dehydration, lifestyle factors (alcohol, caffeine). Consider career stress and lifestyle habits first.",
-            
-            "Middle-Aged": "CRITICAL: Age-specific diagnosis required. Most likely causes: chronic stress, sedentary lifestyle, weight-related issues, early signs of age-related conditions (hypertension, diabetes), work-life balance issues. Consider family history and preventive screening needs.",
-            
-            "Senior": "CRITICAL: Age-specific diagnosis required. Most likely causes: arthritis, age-related degeneration, medication side effects, reduced mobility, chronic conditions. Ask about current medications and existing conditions. Consider fall risks and mobility limitations.",
-            
-            "Elderly": "CRITICAL: Age-specific diagnosis required. Most likely causes: multiple chronic conditions, medication interactions, reduced healing capacity, balance issues, cognitive factors. Be extra thorough about medication review and consider caregiver involvement."
-        }
-        return age_guidance_map.get(age_category, "")
+        return _AGE_GUIDANCE.get(age_category, "")
     
     def _add_to_history(self, role: str, content: str):
         """Add message to conversation history"""
@@ -508,3 +906,5 @@ Treatment Plan:"""
             "role": role,
             "content": content
         })
+        if role == "user":
+            self._user_turns += 1
@@ -0,0 +1,44 @@
+"""
+Retry helper - exponential backoff with jitter for rate-limited upstream calls
+"""
+import asyncio
+import random
+from typing import Any, Awaitable, Callable, Optional
+
+
+async def retry_with_backoff(
+    fn: Callable[[], Awaitable[Any]],
+    should_retry: Callable[[Exception], bool],
+    retry_after: Optional[Callable[[Exception], Optional[float]]] = None,
+    max_retries: int = 5,
+    base_delay: float = 0.5,
+    max_delay: float = 20.0
+) -> Any:
+    """
+    Run fn, retrying errors that should_retry accepts (e.g. HTTP 429)
+
+    Args:
+        fn: Zero-argument coroutine factory performing the call
+        should_retry: Returns True for exceptions worth retrying
+        retry_after: Optional server-provided delay (seconds) for an exception
+        max_retries: Retries after the first attempt before giving up
+        base_delay: Backoff for the first retry, doubled each attempt
+        max_delay: Upper bound on any single wait
+
+    Returns:
+        Result of the first successful fn call
+    """
+    attempt = 0
+    while True:
+        try:
+            return await fn()
+        except Exception as e:
+            if attempt >= max_retries or not should_retry(e):
+                raise
+
+            # Prefer the server's hint; otherwise exponential backoff + jitter
+            delay = retry_after(e) if retry_after else None
+            if delay is None:
+                delay = base_delay * (2 ** attempt) + random.uniform(0, base_delay)
+            await asyncio.sleep(min(delay, max_delay))
+            attempt += 1
@@ -0,0 +1,43 @@
+"""
+Single-flight helper - collapses concurrent identical upstream calls
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """Share one in-flight call among concurrent callers with the same key"""
+
+    def __init__(self):
+        """Initialize with no calls in flight"""
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn once per key; concurrent callers await the same result
+
+        Args:
+            key: Identity of the request (e.g. a hash of its inputs)
+            fn: Zero-argument coroutine factory performing the upstream call
+
+        Returns:
+            Result of fn (shared with every caller that joined while in flight)
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            # The call runs in its own task, owned by no caller, so cancelling
+            # any caller (the first included) never cancels the shared call
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+
+        # shield() so one caller's cancellation doesn't reach the others
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task):
+        """Forget a finished call so the next caller starts a fresh one"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark any error retrieved so asyncio doesn't warn if every caller left
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,57 @@
+"""
+Tests for the selective gzip middleware
+"""
+import unittest
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response
+from fastapi.testclient import TestClient
+from middleware.compression import SelectiveGZipMiddleware
+
+BODY = "x" * 2048
+
+
+class SelectiveGZipTests(unittest.TestCase):
+    """Compression on JSON routes, passthrough on excluded prefixes"""
+    
+    def setUp(self):
+        app = FastAPI()
+        
+        @app.get("/api/insights")
+        async def insights():
+            return PlainTextResponse(BODY)
+        
+        @app.get("/api/tts/stream")
+        async def audio():
+            return Response(BODY.encode(), media_type="audio/mpeg")
+        
+        @app.get("/api/small")
+        async def small():
+            return PlainTextResponse("ok")
+        
+        app.add_middleware(
+            SelectiveGZipMiddleware, minimum_size=512, exclude_paths=["/api/tts"]
+        )
+        self.client = TestClient(app)
+        self.headers = {"Accept-Encoding": "gzip"}
+    
+    def test_compresses_large_responses(self):
+        response = self.client.get("/api/insights", headers=self.headers)
+        
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(response.text, BODY)
+    
+    def test_excluded_prefix_is_untouched(self):
+        response = self.client.get("/api/tts/stream", headers=self.headers)
+        
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertEqual(response.content, BODY.encode())
+    
+    def test_small_responses_are_untouched(self):
+        response = self.client.get("/api/small", headers=self.headers)
+        
+        self.assertNotIn("content-encoding", response.headers)
+
+
+if __name__ == "__main__":
+    unittest.main()
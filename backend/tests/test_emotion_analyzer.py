@@ -0,0 +1,39 @@
+"""
+Tests for EmotionAnalyzer statistics
+"""
+import unittest
+
+from services.emotion_analyzer import EmotionAnalyzer
+
+
+class StatisticsTests(unittest.TestCase):
+    """Batch and incremental emotion statistics"""
+    
+    def setUp(self):
+        self.analyzer = EmotionAnalyzer()
+    
+    def test_accumulator_matches_batch_statistics(self):
+        emotions = ["happy", "sad", "happy", "neutral"]
+        accumulator = self.analyzer.make_accumulator()
+        for emotion in emotions:
+            accumulator.add(emotion)
+        
+        self.assertEqual(accumulator.snapshot(), self.analyzer.calculate_statistics(emotions))
+    
+    def test_statistics(self):
+        stats = self.analyzer.calculate_statistics(["happy", "sad", "happy", "neutral"])
+        
+        self.assertEqual(stats["total_samples"], 4)
+        self.assertEqual(stats["emotion_counts"], {"happy": 2, "sad": 1, "neutral": 1})
+        self.assertEqual(stats["emotion_percentages"]["happy"], 50.0)
+        self.assertEqual(stats["dominant_emotion"], "happy")
+    
+    def test_empty_statistics(self):
+        stats = self.analyzer.calculate_statistics([])
+        
+        self.assertEqual(stats["emotion_counts"], {})
+        self.assertEqual(stats["dominant_emotion"], "neutral")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+"""
+Tests for the ETag middleware and conditional-request helpers
+"""
+import os
+import unittest
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+os.environ.setdefault("ELEVENLABS_API_KEY", "test-key")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import main
+from middleware.etag import ETagMiddleware, compute_etag, etag_matches
+
+ORIGIN = "http://localhost:3000"
+EMPTY_INSIGHTS = {"conversation": [], "emotions": [], "timestamps": []}
+
+
+class EtagMatchesTests(unittest.TestCase):
+    """If-None-Match parsing"""
+    
+    def setUp(self):
+        self.etag = compute_etag(b"body")
+    
+    def test_missing_header(self):
+        self.assertFalse(etag_matches(None, self.etag))
+        self.assertFalse(etag_matches("", self.etag))
+    
+    def test_single_tag(self):
+        self.assertTrue(etag_matches(self.etag, self.etag))
+        self.assertFalse(etag_matches('"other"', self.etag))
+    
+    def test_tag_list(self):
+        self.assertTrue(etag_matches(f'"a", {self.etag} ,"b"', self.etag))
+        self.assertFalse(etag_matches('"a", "b"', self.etag))
+    
+    def test_wildcard(self):
+        self.assertTrue(etag_matches(" * ", self.etag))
+    
+    def test_weak_comparison(self):
+        self.assertTrue(etag_matches(f"W/{self.etag}", self.etag))
+        self.assertTrue(etag_matches(self.etag, f"W/{self.etag}"))
+        self.assertTrue(etag_matches(f"W/{self.etag}", f"W/{self.etag}"))
+    
+    def test_compute_etag_is_stable(self):
+        self.assertEqual(compute_etag(b"body"), self.etag)
+        self.assertNotEqual(compute_etag(b"other"), self.etag)
+
+
+class InsightsConditionalTests(unittest.TestCase):
+    """Conditional /api/insights responses through the full middleware stack"""
+    
+    def setUp(self):
+        self.client = TestClient(main.app)
+    
+    def test_conditional_response_has_cors_headers(self):
+        etag = self.client.post("/api/insights", json=EMPTY_INSIGHTS).headers["etag"]
+        
+        response = self.client.post(
+            "/api/insights",
+            json=EMPTY_INSIGHTS,
+            headers={"Origin": ORIGIN, "If-None-Match": etag}
+        )
+        
+        self.assertEqual(response.headers["access-control-allow-origin"], ORIGIN)
+        self.assertIn("Origin", response.headers["vary"])
+    
+    def test_matching_post_is_precondition_failed(self):
+        etag = self.client.post("/api/insights", json=EMPTY_INSIGHTS).headers["etag"]
+        
+        response = self.client.post(
+            "/api/insights", json=EMPTY_INSIGHTS, headers={"If-None-Match": etag}
+        )
+        
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(response.headers["etag"], etag)
+    
+    def test_stale_tag_gets_full_response(self):
+        response = self.client.post(
+            "/api/insights", json=EMPTY_INSIGHTS, headers={"If-None-Match": '"stale"'}
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("overview", response.json()["summary"])
+
+
+
+class GetConditionalTests(unittest.TestCase):
+    """Conditional GET responses from the middleware alone"""
+    
+    def setUp(self):
+        app = FastAPI()
+        
+        @app.get("/data")
+        async def data():
+            return {"value": 1}
+        
+        app.add_middleware(ETagMiddleware, paths=["/data"])
+        self.client = TestClient(app)
+    
+    def test_matching_get_is_not_modified(self):
+        etag = self.client.get("/data").headers["etag"]
+        
+        response = self.client.get("/data", headers={"If-None-Match": etag})
+        
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response.headers["etag"], etag)
+
+
+
+class TTSConditionalTests(unittest.TestCase):
+    """Request-derived audio ETags on the TTS routes"""
+    
+    def setUp(self):
+        self.client = TestClient(main.app)
+    
+    def test_audio_etag_is_weak(self):
+        etag = main.tts.tts_service.audio_etag("Hello!")
+        
+        self.assertTrue(etag.startswith('W/"'))
+    
+    def test_cached_clip_is_not_resynthesized(self):
+        etag = main.tts.tts_service.audio_etag("Hello!")
+        
+        for path in ("/api/tts", "/api/tts/stream"):
+            response = self.client.post(
+                path, json={"text": "Hello!"}, headers={"If-None-Match": etag}
+            )
+            
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.headers["etag"], etag)
+
+
+if __name__ == "__main__":
+    unittest.main()
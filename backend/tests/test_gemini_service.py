@@ -0,0 +1,207 @@
+"""
+Tests for GeminiService conversation handling (no network calls)
+"""
+import asyncio
+import os
+import time
+import unittest
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+
+from google.genai import types
+from services.gemini_service import GeminiService, _CLOSING_RE
+
+
+def _content(role: str, text: str) -> types.Content:
+    """Chat history entry with a single text part"""
+    return types.Content(role=role, parts=[types.Part(text=text)])
+
+
+def _chunk(text: str) -> types.GenerateContentResponse:
+    """Streamed response chunk carrying some reply text"""
+    return types.GenerateContentResponse(candidates=[types.Candidate(content=_content("model", text))])
+
+
+class LocalClosingTests(unittest.TestCase):
+    """Sign-off replies answered without a Gemini call"""
+    
+    def setUp(self):
+        self.service = GeminiService()
+        self.service._add_to_history("user", "I have a headache")
+        self.service._add_to_history("assistant", "Where exactly is the pain?")
+        self.service._add_to_history("user", "Front of my head")
+    
+    def test_closes_after_sign_off_question(self):
+        self.service._add_to_history("assistant", "You're welcome! Anything else I can help with today?")
+        
+        result = self.service._local_closing("Nope, I'm good. Thanks!")
+        
+        self.assertIsNotNone(result)
+        self.assertTrue(result["should_end_consultation"])
+        self.assertFalse(result["followup_needed"])
+    
+    def test_diagnostic_question_is_not_a_sign_off(self):
+        self.service._add_to_history("assistant", "Any fever, nausea, or anything else unusual?")
+        
+        self.assertIsNone(self.service._local_closing("No."))
+    
+    def test_sign_off_must_be_the_whole_reply(self):
+        self.service._add_to_history("assistant", "Anything else I can help with?")
+        
+        self.assertIsNone(self.service._local_closing("No, but my head still hurts"))
+    
+    def test_non_matching_input_is_linear(self):
+        for message in ("no " * 24 + "x", "No, " * 20 + "wait, one more thing", "no " * 5000 + "x"):
+            start = time.perf_counter()
+            self.assertIsNone(_CLOSING_RE.match(message))
+            self.assertLess(time.perf_counter() - start, 0.1)
+
+
+
+class StreamResponseTests(unittest.TestCase):
+    """Events yielded by stream_response"""
+    
+    def test_failed_stream_ends_with_chat_response_fields(self):
+        service = GeminiService()
+        
+        async def fail(message):
+            raise RuntimeError("upstream exploded")
+        
+        service._start_stream = fail
+        
+        async def collect():
+            return [event async for event in service.stream_response("I have a headache", "neutral")]
+        
+        events = asyncio.run(collect())
+        
+        self.assertTrue(events[0]["delta"])
+        self.assertEqual(
+            events[-1],
+            {
+                "done": True,
+                "text": events[0]["delta"],
+                "followup_needed": True,
+                "should_end_consultation": False
+            }
+        )
+    
+    def test_stream_failing_midway_keeps_shown_text(self):
+        service = GeminiService()
+        
+        async def chunks():
+            yield _chunk(" up?")
+            raise RuntimeError("connection reset")
+        
+        async def start(message):
+            return _chunk("What brings you"), chunks()
+        
+        service._start_stream = start
+        
+        async def collect():
+            return [event async for event in service.stream_response("Hi", "neutral")]
+        
+        events = asyncio.run(collect())
+        
+        self.assertEqual(events, [
+            {"delta": "What brings you"},
+            {"delta": " up?"},
+            {"done": True, "error": True}
+        ])
+        self.assertEqual(
+            list(service.conversation_history),
+            [
+                {"role": "user", "content": "Hi"},
+                {"role": "assistant", "content": "What brings you up?"}
+            ]
+        )
+
+
+class TrimChatHistoryTests(unittest.TestCase):
+    """Token-budget trimming of the SDK chat history"""
+    
+    def setUp(self):
+        self.service = GeminiService()
+        self.service._history_token_budget = 100
+        self.dropped = []
+        
+        async def record_synopsis(dropped):
+            self.dropped.append(dropped)
+        
+        self.service._update_synopsis = record_synopsis
+    
+    def trim(self, history):
+        self.service.chat_session = self.service._new_chat_session(history)
+        asyncio.run(self.service._trim_chat_history())
+        return self.service.chat_session.get_history(curated=True)
+    
+    def test_streamed_turns_are_dropped_whole(self):
+        # Streamed replies are recorded as one model content per chunk
+        history = [
+            _content("user", "u1 " + "a" * 200),
+            _content("model", "m1a " + "b" * 100),
+            _content("model", "m1b " + "b" * 100),
+            _content("model", "m1c " + "b" * 100),
+            _content("user", "u2 " + "a" * 200),
+            _content("model", "m2a " + "b" * 100),
+            _content("model", "m2b " + "b" * 100),
+        ]
+        
+        kept = self.trim(history)
+        
+        self.assertEqual([c.role for c in kept], ["user", "model", "model"])
+        self.assertTrue(kept[0].parts[0].text.startswith("u2"))
+        self.assertEqual([c.role for c in self.dropped[0]], ["user", "model", "model", "model"])
+    
+    def test_under_budget_history_is_untouched(self):
+        history = [_content("user", "hi"), _content("model", "hello")]
+        
+        kept = self.trim(history)
+        
+        self.assertEqual(len(kept), 2)
+        self.assertEqual(self.dropped, [])
+
+
+
+class SynopsisTests(unittest.TestCase):
+    """Rolling synopsis of trimmed chat history"""
+    
+    def setUp(self):
+        self.service = GeminiService()
+        self.service._history_token_budget = 100
+        self.prompts = []
+        
+        async def generate_content(model, contents, config):
+            self.prompts.append(contents)
+            return types.GenerateContentResponse(candidates=[
+                types.Candidate(content=_content("model", "Patient reports a frontal headache."))
+            ])
+        
+        self.service._call_gemini = lambda fn, **kwargs: generate_content(**kwargs)
+    
+    def test_synopsis_covers_only_dropped_turns(self):
+        history = [
+            _content("user", "My head hurts " + "a" * 200),
+            _content("model", "Where is the pain? "),
+            _content("model", "b" * 200),
+            _content("user", "Front of my head " + "c" * 200),
+            _content("model", "d" * 100),
+        ]
+        self.service.chat_session = self.service._new_chat_session(history)
+        
+        asyncio.run(self.service._trim_chat_history())
+        
+        prompt = self.prompts[0]
+        self.assertIn("Patient: My head hurts", prompt)
+        self.assertIn("Doctor: Where is the pain? bbb", prompt)
+        self.assertNotIn("Front of my head", prompt)
+        
+        kept = self.service.chat_session.get_history(curated=True)
+        self.assertTrue(kept[0].parts[0].text.startswith("Front of my head"))
+        self.assertIn(
+            "CONSULTATION SO FAR: Patient reports a frontal headache.",
+            self.service.chat_session._config.system_instruction
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
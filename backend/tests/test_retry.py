@@ -0,0 +1,114 @@
+"""
+Tests for retry_with_backoff and the ElevenLabs Retry-After hint
+"""
+import unittest
+from unittest import mock
+
+from services.elevenlabs_service import ElevenLabsService
+from services.retry import retry_with_backoff
+
+
+class RateLimited(Exception):
+    """Stand-in for an HTTP 429 error"""
+    
+    def __init__(self, retry_after=None):
+        super().__init__("429")
+        self.retry_after = retry_after
+
+
+class RetryWithBackoffTests(unittest.IsolatedAsyncioTestCase):
+    """Backoff schedule and retry decisions"""
+    
+    def setUp(self):
+        self.delays = []
+        
+        async def sleep(delay):
+            self.delays.append(delay)
+        
+        patcher = mock.patch("services.retry.asyncio.sleep", sleep)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def flaky(self, errors, result="ok"):
+        """Coroutine factory raising each error in turn, then returning result"""
+        pending = list(errors)
+        
+        async def call():
+            if pending:
+                raise pending.pop(0)
+            return result
+        
+        return call
+    
+    async def test_honors_retry_after(self):
+        result = await retry_with_backoff(
+            self.flaky([RateLimited(3.0), RateLimited(1.5)]),
+            should_retry=lambda e: isinstance(e, RateLimited),
+            retry_after=lambda e: e.retry_after
+        )
+        
+        self.assertEqual(result, "ok")
+        self.assertEqual(self.delays, [3.0, 1.5])
+    
+    async def test_retry_after_is_capped(self):
+        await retry_with_backoff(
+            self.flaky([RateLimited(120.0)]),
+            should_retry=lambda e: isinstance(e, RateLimited),
+            retry_after=lambda e: e.retry_after,
+            max_delay=20.0
+        )
+        
+        self.assertEqual(self.delays, [20.0])
+    
+    async def test_exponential_backoff_without_hint(self):
+        await retry_with_backoff(
+            self.flaky([RateLimited()] * 3),
+            should_retry=lambda e: isinstance(e, RateLimited),
+            retry_after=lambda e: e.retry_after,
+            base_delay=0.5
+        )
+        
+        # base * 2**attempt plus up to one base of jitter
+        for attempt, delay in enumerate(self.delays):
+            self.assertGreaterEqual(delay, 0.5 * 2 ** attempt)
+            self.assertLessEqual(delay, 0.5 * 2 ** attempt + 0.5)
+        self.assertEqual(len(self.delays), 3)
+    
+    async def test_other_errors_are_not_retried(self):
+        with self.assertRaises(ValueError):
+            await retry_with_backoff(
+                self.flaky([ValueError("bad request")]),
+                should_retry=lambda e: isinstance(e, RateLimited)
+            )
+        
+        self.assertEqual(self.delays, [])
+    
+    async def test_gives_up_after_max_retries(self):
+        with self.assertRaises(RateLimited):
+            await retry_with_backoff(
+                self.flaky([RateLimited(1.0)] * 3),
+                should_retry=lambda e: isinstance(e, RateLimited),
+                retry_after=lambda e: e.retry_after,
+                max_retries=2
+            )
+        
+        self.assertEqual(self.delays, [1.0, 1.0])
+
+
+class RetryAfterHeaderTests(unittest.TestCase):
+    """Parsing the ElevenLabs Retry-After header"""
+    
+    def error(self, headers):
+        return mock.Mock(headers=headers)
+    
+    def test_reads_seconds_case_insensitively(self):
+        self.assertEqual(ElevenLabsService._retry_after(self.error({"Retry-After": "2"})), 2.0)
+    
+    def test_missing_or_invalid_header(self):
+        self.assertIsNone(ElevenLabsService._retry_after(self.error({})))
+        self.assertIsNone(ElevenLabsService._retry_after(self.error(None)))
+        self.assertIsNone(ElevenLabsService._retry_after(self.error({"retry-after": "soon"})))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+"""
+Tests for the SingleFlight helper
+"""
+import asyncio
+import unittest
+
+from services.single_flight import SingleFlight
+
+
+class SingleFlightTests(unittest.IsolatedAsyncioTestCase):
+    """Sharing one in-flight call among concurrent callers"""
+
+    async def test_concurrent_callers_share_one_call(self):
+        flight = SingleFlight()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0)
+            return "summary"
+
+        results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+
+        self.assertEqual(results, ["summary"] * 5)
+        self.assertEqual(calls, 1)
+
+    async def test_different_keys_run_separately(self):
+        flight = SingleFlight()
+
+        async def fetch(value):
+            await asyncio.sleep(0)
+            return value
+
+        results = await asyncio.gather(
+            flight.do("a", lambda: fetch("a")), flight.do("b", lambda: fetch("b"))
+        )
+
+        self.assertEqual(results, ["a", "b"])
+
+    async def test_error_reaches_every_caller(self):
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0)
+            raise RuntimeError("upstream down")
+
+        results = await asyncio.gather(
+            flight.do("key", fail), flight.do("key", fail), return_exceptions=True
+        )
+
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+
+    async def test_key_is_released_after_the_call(self):
+        flight = SingleFlight()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            return calls
+
+        self.assertEqual(await flight.do("key", fetch), 1)
+        self.assertEqual(await flight.do("key", fetch), 2)
+
+    async def test_cancelled_leader_does_not_cancel_waiters(self):
+        flight = SingleFlight()
+        calls = 0
+        release = asyncio.Event()
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return "audio"
+
+        leader = asyncio.create_task(flight.do("key", fetch))
+        waiter = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        self.assertEqual(await waiter, "audio")
+        with self.assertRaises(asyncio.CancelledError):
+            await leader
+        self.assertEqual(calls, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -22,8 +22,14 @@ export async function POST(request: NextRequest) {
       throw new Error(`Backend responded with status: ${response.status}`);
     }
     
-    const data = await response.json();
-    return NextResponse.json(data);
+    // Pass the raw MP3 bytes straight through
+    const audio = await response.arrayBuffer();
+    return new NextResponse(audio, {
+      headers: {
+        'Content-Type': 'audio/mpeg',
+        'Content-Length': String(audio.byteLength),
+      },
+    });
   } catch (error) {
     console.error('TTS API error:', error);
     return NextResponse.json(
@@ -278,7 +278,7 @@ export default function AudioController({
 
     try {
       setError(null);
-      const response = await fetch(`${API_BASE_URL}/api/tts`, {
+      const response = await fetch(`${API_BASE_URL}/api/tts/stream`, {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
@@ -290,11 +290,12 @@ export default function AudioController({
         throw new Error("TTS request failed");
       }
 
-      const data = await response.json();
+      // Raw MP3 bytes (no base64 round-trip)
+      const audioBlob = await response.blob();
 
-      if (data.audio_base64) {
-        // Convert base64 to playable URL
-        const audioUrl = `data:audio/mpeg;base64,${data.audio_base64}`;
+      if (audioBlob.size > 0) {
+        // Convert audio bytes to playable URL
+        const audioUrl = URL.createObjectURL(audioBlob);
 
         // Stop any currently playing audio first
         if (currentAudioRef.current) {
@@ -316,6 +317,7 @@ export default function AudioController({
           },
           () => {
             console.log("AudioController: Audio ended");
+            URL.revokeObjectURL(audioUrl);
             setIsPlaying(false);
             onSpeakingStateChange?.(false);
             window.dispatchEvent(new CustomEvent("audioPlaybackEnd"));
@@ -340,6 +342,7 @@ export default function AudioController({
           },
           (error) => {
             console.error("AudioController: Audio error:", error);
+            URL.revokeObjectURL(audioUrl);
             setError(error);
             setIsPlaying(false);
             onSpeakingStateChange?.(false);
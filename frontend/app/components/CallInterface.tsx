@@ -134,10 +134,10 @@ export default function CallInterface({
         return;
       }
 
-      const data = await response.json();
+      const audioBlob = await response.blob();
 
-      if (data.audio_base64) {
-        const audioUrl = `data:audio/mpeg;base64,${data.audio_base64}`;
+      if (audioBlob.size > 0) {
+        const audioUrl = URL.createObjectURL(audioBlob);
         const audio = new Audio(audioUrl);
 
         audio.onplay = () => {
@@ -146,6 +146,7 @@ export default function CallInterface({
         };
 
         audio.onended = () => {
+          URL.revokeObjectURL(audioUrl);
           setIsSpeaking(false);
           window.dispatchEvent(new CustomEvent("audioPlaybackEnd"));
           // Enable listening after greeting finishes
@@ -154,6 +155,7 @@ export default function CallInterface({
 
         audio.onerror = () => {
           console.error("Failed to play greeting audio");
+          URL.revokeObjectURL(audioUrl);
           setIsSpeaking(false);
         };
 
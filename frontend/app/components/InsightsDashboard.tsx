@@ -6,9 +6,9 @@
 
 import { useState } from "react";
 
-interface EmotionData {
-  timestamp: string;
-  emotion: string;
+interface EmotionChart {
+  timestamps: string[];
+  emotions: string[];
 }
 
 interface EmotionStats {
@@ -20,7 +20,7 @@ interface EmotionStats {
 
 interface InsightsDashboardProps {
   summary?: string;
-  emotionChart?: EmotionData[];
+  emotionChart?: EmotionChart;
   emotionStats?: EmotionStats;
   onRequestInsights?: () => void;
 }
@@ -147,7 +147,7 @@ export default function InsightsDashboard({
           )}
 
           {/* Emotion timeline (placeholder for chart) */}
-          {emotionChart && emotionChart.length > 0 && (
+          {emotionChart && emotionChart.timestamps.length > 0 && (
             <div>
               <h3 className="text-lg font-semibold text-gray-800 mb-3">
                 Emotion Timeline
@@ -96,9 +96,11 @@ export default function SetupPage({
 
       if (!response.ok) throw new Error("Failed to generate preview");
 
-      const data = await response.json();
-      if (data.audio_base64) {
-        const audio = new Audio(`data:audio/mpeg;base64,${data.audio_base64}`);
+      const audioBlob = await response.blob();
+      if (audioBlob.size > 0) {
+        const audioUrl = URL.createObjectURL(audioBlob);
+        const audio = new Audio(audioUrl);
+        audio.onended = () => URL.revokeObjectURL(audioUrl);
         await audio.play();
       }
     } catch (error) {